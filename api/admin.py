@@ -1,97 +1,108 @@
 # api/admin.py
 from fastapi import APIRouter, Query, HTTPException
-from db.mongo import users_collection, playlists_collection
-from services.token import get_token
+from db.jobs import find_job
+from db.playlists import apply_synced_playlist_changes, find_synced_snapshots
 from datetime import datetime, timezone
-import spotipy
-from services.spotify import get_spotify_client
+from services.spotify_api import spotify_api
+from services.token import get_token_by_user_id
+from services.artists import artist_genre_cache
+from services.playlist_backfill import start_playlist_backfill
+from services.playback_stream import active_playback_streams
+from services.response_cache import public_cache
+from services import metrics
 
 router = APIRouter(tags=["admin"])
 
-@router.post("/admin/backfill-playlist-metadata")
-def backfill_playlist_metadata():
-    users = users_collection.find({"playlists.all": {"$exists": True}})
-    updated = 0
-
-    for user in users:
-        access_token = user.get("access_token")
-        if not access_token:
-            continue
+@router.get("/admin/metrics")
+async def get_metrics():
+    return {
+        **metrics.snapshot(),
+        "caches": {
+            "artist_genres": artist_genre_cache.stats(),
+            "public_responses": public_cache.stats(),
+        },
+        "playback_streams": active_playback_streams(),
+    }
 
-        sp = spotipy.Spotify(auth=access_token)
-        updated_playlists = []
+@router.post("/admin/backfill-playlist-metadata")
+async def backfill_playlist_metadata():
+    job_id = await start_playlist_backfill()
+    return {"status": "started", "job_id": job_id}
 
-        for pl in user.get("playlists.all", []):
-            try:
-                playlist = sp.playlist(pl["playlist_id"])
-                pl["track_count"] = playlist["tracks"]["total"]
-                pl["external_url"] = playlist["external_urls"]["spotify"]
-                updated_playlists.append(pl)
-            except Exception as e:
-                print(f"⚠️ Failed to update playlist {pl['playlist_id']}: {e}")
-                continue
 
-        users_collection.update_one(
-            {"user_id": user["user_id"]},
-            {"$set": {"playlists.all": updated_playlists}},
-        )
-        updated += 1
+@router.get("/admin/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = await find_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    return {"status": "ok", "users_updated": updated}
+    return {
+        "job_id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": job.get("progress", {}),
+        "checkpoint": job.get("checkpoint"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job.get("finished_at"),
+    }
+
+
+def _synced_entry(p: dict) -> dict:
+    return {
+        "id": p["id"],
+        "name": p["name"],
+        "tracks": p["tracks"]["total"],
+        "owner_id": p["owner"]["id"],
+        "image": p["images"][0]["url"] if p["images"] else None,
+        "external_url": p["external_urls"]["spotify"],
+        "snapshot_id": p.get("snapshot_id"),
+    }
 
 
 @router.post("/admin/sync_playlists")
-def sync_playlists(user_id: str = Query(...)):
-    sp = get_spotify_client(user_id)
+async def sync_playlists(user_id: str = Query(...)):
+    """Bring the synced playlists in line with Spotify, touching only what changed.
+
+    Entries are keyed by id and compared on snapshot_id, which Spotify bumps
+    on every edit to a playlist.
+    """
+    access_token = await get_token_by_user_id(user_id)
 
-    all_playlists = []
-    offset = 0
-    limit = 50
     total_fetched = 0
 
-    user_profile = sp.current_user()
+    user_profile = await spotify_api.current_user(access_token)
     spotify_user_id = user_profile["id"]
 
-    while True:
-        page = sp.current_user_playlists(limit=limit, offset=offset)
-        items = page.get("items", [])
-
-        if not items:
-            break
-
-        for p in items:
-            if p["owner"]["id"] != spotify_user_id or p["tracks"]["total"] < 4:
-                continue
-
-            all_playlists.append(
-                {
-                    "id": p["id"],
-                    "name": p["name"],
-                    "tracks": p["tracks"]["total"],
-                    "owner_id": p["owner"]["id"],
-                    "image": p["images"][0]["url"] if p["images"] else None,
-                    "external_url": p["external_urls"]["spotify"],
-                }
-            )
-
-        offset += limit
-        total_fetched += len(items)
-
-    playlists_collection.update_one(
-        {"user_id": user_id},
-        {
-            "$set": {
-                "user_id": user_id,
-                "playlists": all_playlists,
-                "last_updated": datetime.now(timezone.utc),
-            }
-        },
-        upsert=True,
-    )
+    stored_snapshots = await find_synced_snapshots(user_id)
+
+    added, changed = [], []
+    seen = set()
+
+    async for p in spotify_api.paginate("/me/playlists", access_token):
+        total_fetched += 1
+        if p["owner"]["id"] != spotify_user_id or p["tracks"]["total"] < 4:
+            continue
+        if p["id"] in seen:
+            continue
+        seen.add(p["id"])
+
+        if p["id"] not in stored_snapshots:
+            added.append(_synced_entry(p))
+        elif stored_snapshots[p["id"]] != p.get("snapshot_id"):
+            changed.append(_synced_entry(p))
+
+    removed_ids = [pid for pid in stored_snapshots if pid not in seen]
+    await apply_synced_playlist_changes(user_id, added, changed, removed_ids)
 
     return {
         "status": "ok",
         "user_id": user_id,
         "total_playlists_fetched": total_fetched,
-        "total_playlists_saved": len(all_playlists),
+        "total_playlists_saved": len(seen),
+        "added": len(added),
+        "changed": len(changed),
+        "unchanged": len(seen) - len(added) - len(changed),
+        "removed": len(removed_ids),
     }
\ No newline at end of file
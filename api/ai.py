@@ -2,7 +2,8 @@
 from fastapi import APIRouter, HTTPException, Query
 from openai import OpenAI
 from dotenv import load_dotenv, find_dotenv
-from db.mongo import users_collection
+from starlette.concurrency import run_in_threadpool
+from db.users import find_genre_analysis
 import os
 import json
 
@@ -33,11 +34,11 @@ def chatgpt(prompt: str, model: str = "gpt-4.1-nano") -> str:
         raise HTTPException(status_code=500, detail=f"OpenAI error: {str(e)}")
 
 @router.get("/ai-genres")
-def generate_ai_genre_commentary(user_id: str = Query(...)):
+async def generate_ai_genre_commentary(user_id: str = Query(...)):
     if not client:
         raise HTTPException(status_code=503, detail="AI service unavailable: OPENAI_API_KEY not set")
 
-    doc = users_collection.find_one({"user_id": user_id})
+    doc = await find_genre_analysis(user_id)
     if not doc or "genre_analysis" not in doc:
         raise HTTPException(status_code=404, detail="No genre analysis found for user")
 
@@ -65,7 +66,7 @@ Format your results as a JSON object with "sen-#" and /
 ```{music_data_str}```
 """
 
-    result = chatgpt(prompt)
+    result = await run_in_threadpool(chatgpt, prompt)
     
     try:
         parsed = json.loads(result)
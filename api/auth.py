@@ -2,11 +2,14 @@
 from fastapi import APIRouter, Request, Query, HTTPException
 from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
 import base64, json, os
-import spotipy
+from datetime import datetime, timezone
+from starlette.concurrency import run_in_threadpool
 
-from services.spotify_auth import get_spotify_oauth
-from db.mongo import users_collection
-from services.token import refresh_user_token
+from services.spotify_auth import get_spotify_oauth, refresh_access_token
+from services.spotify_api import SpotifyAPIError, spotify_api
+from services.rate_limit import SpotifyRateLimited
+from db.users import set_user_tokens
+from services.token import refresh_user_token, cache_token
 
 router = APIRouter(tags=["auth"])
 
@@ -51,10 +54,11 @@ async def callback(request: Request):
 
     try:
         sp_oauth = get_spotify_oauth(redirect_uri)
-        token_info = sp_oauth.get_access_token(code, as_dict=True)
-        sp = spotipy.Spotify(auth=token_info["access_token"])
-        profile = sp.current_user()
+        token_info = await run_in_threadpool(sp_oauth.get_access_token, code, as_dict=True)
+        profile = await spotify_api.current_user(token_info["access_token"])
         user_id = profile.get("id")
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         print(f"❌ Token exchange or user fetch failed: {e}")
         raise HTTPException(status_code=500, detail=f"Internal callback error: {e}")
@@ -63,17 +67,17 @@ async def callback(request: Request):
         raise HTTPException(status_code=400, detail="Spotify user ID missing.")
 
     # Update or create user record
-    users_collection.update_one(
-        {"user_id": user_id},
+    await set_user_tokens(
+        user_id,
         {
-            "$set": {
-                "access_token": token_info["access_token"],
-                "refresh_token": token_info["refresh_token"],
-                "expires_at": token_info["expires_at"],
-            }
+            "access_token": token_info["access_token"],
+            "refresh_token": token_info["refresh_token"],
+            "expires_at": token_info["expires_at"],
+            "last_active_at": datetime.now(timezone.utc),
         },
         upsert=True,
     )
+    cache_token(user_id, token_info["access_token"], token_info["expires_at"])
 
     # Build redirect response with secure, server-set cookie
     frontend_base = DEV_BASE_URL if IS_DEV else PRO_BASE_URL
@@ -95,9 +99,8 @@ async def callback(request: Request):
 
 
 @router.get("/refresh_token")
-def refresh_token(refresh_token: str = Query(...)):
-    sp_oauth = get_spotify_oauth()
-    refreshed = sp_oauth.refresh_access_token(refresh_token)
+async def refresh_token(refresh_token: str = Query(...)):
+    refreshed = await refresh_access_token(refresh_token)
     return {
         "access_token": refreshed["access_token"],
         "expires_in": refreshed["expires_in"],
@@ -105,11 +108,11 @@ def refresh_token(refresh_token: str = Query(...)):
 
 
 @router.get("/refresh-session")
-def refresh_session(user_id: str = Query(...)):
-    return refresh_user_token(user_id)
+async def refresh_session(user_id: str = Query(...)):
+    return await refresh_user_token(user_id)
 
 @router.get("/logout")
-def logout_user():
+async def logout_user():
     response = JSONResponse({"message": "Logged out"})
     response.delete_cookie(
         key="sinatra_user_id",
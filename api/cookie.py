@@ -7,7 +7,7 @@ router = APIRouter(tags=["cookie"])
 
 
 @router.post("/set-cookie")
-def set_cookie(data: CookiePayload):
+async def set_cookie(data: CookiePayload):
     if not data.user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
 
@@ -1,41 +1,65 @@
 # api/dashboard.py
-from fastapi import APIRouter, Request, HTTPException
-from db.mongo import users_collection
-from api.genres import get_genres
+from fastapi import APIRouter, Request, HTTPException, Response
+from core.responses import FastJSONResponse
+from db.profile_playlists import find_dashboard
+from api.genres import get_genre_analysis, refresh_genres_if_stale
+from services.rate_limit import SpotifyRateLimited
+from services.spotify_api import SpotifyAPIError
 from services.music.track_utils import apply_meta_gradients
+import traceback
 
 router = APIRouter(tags=["dashboard"])
 
+# Always revalidate; the ETag makes that a cheap 304 when nothing changed
+DASHBOARD_CACHE_CONTROL = "private, no-cache"
+
+
+def dashboard_etag(user_id: str, version: int) -> str:
+    # The user id keeps one browser's cached dashboard from matching another account
+    return f'"{user_id}-{version}"'
+
+
 @router.get("/dashboard")
-def get_dashboard(request: Request):
+async def get_dashboard(request: Request):
     user_id = request.cookies.get("sinatra_user_id")
     print(f"🍪 /dashboard cookie received: sinatra_user_id = {user_id}")
 
     if not user_id:
         raise HTTPException(status_code=401, detail="Not logged in")
 
-    doc = users_collection.find_one({"user_id": user_id})
+    doc = await find_dashboard(user_id)
     if not doc:
         print(f"❌ /dashboard: user not found in DB for user_id = {user_id}")
         raise HTTPException(status_code=404, detail="User not found")
 
-    playlists_data = doc.get("playlists", {})
-    all_playlists = playlists_data.get("all", [])
-    featured_ids = playlists_data.get("featured", [])
-
-    # Create a lookup for faster matching
-    playlist_lookup = {pl.get("id") or pl.get("playlist_id"): pl for pl in all_playlists}
-    featured_playlists = [playlist_lookup.get(pid) for pid in featured_ids if pid in playlist_lookup]
+    etag = dashboard_etag(user_id, doc["version"])
+    headers = {"ETag": etag, "Cache-Control": DASHBOARD_CACHE_CONTROL}
+    if doc.get("genre_analysis") and etag in request.headers.get("if-none-match", ""):
+        # The client's copy is current, but its analysis may still be due a recompute
+        refresh_genres_if_stale(user_id, doc)
+        return Response(status_code=304, headers=headers)
 
     print(f"✅ /dashboard success for user_id = {user_id}")
-    genres_data = get_genres(request)
+    try:
+        genres_data = await get_genre_analysis(user_id, doc=doc)
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Genre analysis failed: {str(e)}")
     last_played = apply_meta_gradients(doc.get("last_played_track", {}))
 
-    return {
+    content = {
         "playlists": {
-            "all": all_playlists,
-            "featured": featured_playlists,
+            "all": doc["all"],
+            "featured": doc["featured"],
+            "total": doc["total"],
+            "next_cursor": doc["next_cursor"],
         },
         "genres": genres_data,
         "last_played": last_played,
     }
+    if not doc.get("genre_analysis"):
+        # Analysis was computed just now, which bumped the version
+        headers = {"Cache-Control": DASHBOARD_CACHE_CONTROL}
+    return FastJSONResponse(content=content, headers=headers)
\ No newline at end of file
@@ -1,73 +1,160 @@
 # api/genres.py
 from fastapi import APIRouter, Query, HTTPException
-from db.mongo import users_collection
-from services.token import get_token
-from services.spotify_auth import get_spotify_oauth
+from db.users import find_genre_analysis, update_user
+from services.token import get_token_by_user_id
+from services.spotify_api import SpotifyAPIError, spotify_api
+from services.rate_limit import BACKGROUND, SpotifyRateLimited, spotify_priority
 from services.music import wizard
 from services.music import meta_gradients
 from datetime import datetime, timezone
 from services.music.wizard import get_gradient_for_genre
 from services.music.meta_gradients import gradients
 from fastapi import Request
-from services.token import get_token_by_user_id
-
+from services import metrics
+import asyncio, time, weakref
 
 import os, json, traceback
 
 router = APIRouter(tags=["genres"])
 
-import json
-from pathlib import Path
+TOP_ARTISTS_PAGE_SIZE = 50
+TOP_ARTISTS_LIMIT = 200
+USER_SPOTIFY_CONCURRENCY = int(os.getenv("USER_SPOTIFY_CONCURRENCY", "4"))
+
+# Serve stored analyses younger than this without recomputing
+GENRE_ANALYSIS_TTL = int(os.getenv("GENRE_ANALYSIS_TTL", str(6 * 3600)))
 
-GENRE_MAP_PATH = Path(__file__).resolve().parent.parent / "services" / "music" / "genre-map.json"
+# user_id -> in-flight recompute, so each user has at most one
+_recomputes = {}
+# user_id -> semaphore bounding that user's concurrent top-artist page requests
+_user_semaphores = weakref.WeakValueDictionary()
 
 @router.get("/genres")
-def get_genres(request: Request, refresh: bool = False):
+async def get_genres(request: Request, refresh: bool = False):
     user_id = request.cookies.get("sinatra_user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing sinatra_user_id cookie")
     try:
-        access_token = get_token(request)
-        return analyze_user_genres(user_id, access_token)
+        return await get_genre_analysis(user_id, refresh=refresh)
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Genre analysis failed: {str(e)}")
 
 
 @router.post("/refresh_genres")
-def refresh_genre_analysis(payload: dict):
+async def refresh_genre_analysis(payload: dict):
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
 
-    users_collection.update_one(
-        {"user_id": user_id},
-        {"$unset": {"genre_analysis": "", "genre_last_updated": ""}},
-    )
-
     try:
-        access_token = get_token_by_user_id(user_id)
-        return analyze_user_genres(user_id, access_token)
+        return await get_genre_analysis(user_id, refresh=True)
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Refresh failed: {str(e)}")
 
 @router.get("/meta-gradients")
-def get_meta_gradients():
+async def get_meta_gradients():
     return gradients
 
-def analyze_user_genres(user_id: str, access_token: str):
-    import spotipy
-    sp = spotipy.Spotify(auth=access_token)
-
-    # Fetch top 200 artists
-    top_artists = []
-    for offset in (0, 50, 100, 150):
-        try:
-            batch = sp.current_user_top_artists(limit=50, offset=offset, time_range="short_term")
-            top_artists.extend(batch.get("items", []))
-        except Exception as e:
-            print(f"⚠️ Failed to fetch top artists at offset {offset}: {e}")
+def _is_stale(last_updated) -> bool:
+    if last_updated is None:
+        return True
+    if last_updated.tzinfo is None:
+        last_updated = last_updated.replace(tzinfo=timezone.utc)
+    age = datetime.now(timezone.utc) - last_updated
+    return age.total_seconds() > GENRE_ANALYSIS_TTL
+
+
+async def _recompute_genres(user_id: str) -> dict:
+    access_token = await get_token_by_user_id(user_id)
+    return await analyze_user_genres(user_id, access_token)
+
+
+def _on_recompute_done(user_id: str, task: asyncio.Task):
+    _recomputes.pop(user_id, None)
+    if not task.cancelled() and task.exception():
+        print(f"⚠️ Background genre recompute failed for {user_id}: {task.exception()}")
+
+
+def schedule_genre_recompute(user_id: str, background: bool = False) -> asyncio.Task:
+    """Start a recompute for the user unless one is already in flight.
+
+    ``background`` recomputes yield Spotify quota to interactive requests.
+    """
+    task = _recomputes.get(user_id)
+    if task is None:
+        if background:
+            # The task copies the current context, priority included
+            with spotify_priority(BACKGROUND):
+                task = asyncio.create_task(_recompute_genres(user_id))
+        else:
+            task = asyncio.create_task(_recompute_genres(user_id))
+        _recomputes[user_id] = task
+        task.add_done_callback(lambda t: _on_recompute_done(user_id, t))
+    return task
+
+
+def refresh_genres_if_stale(user_id: str, doc: dict):
+    """Recompute in the background when ``doc``'s stored analysis is past its TTL."""
+    if _is_stale(doc.get("genre_last_updated")):
+        schedule_genre_recompute(user_id, background=True)
+
+
+async def get_genre_analysis(user_id: str, refresh: bool = False, doc: dict = None) -> dict:
+    """Return the stored analysis, serving stale copies while a recompute runs.
+
+    ``doc`` may be a user document the caller already loaded. A synchronous
+    recompute only happens on ``refresh`` or when nothing is stored yet.
+    """
+    if not refresh:
+        if doc is None:
+            doc = await find_genre_analysis(user_id)
+        analysis = (doc or {}).get("genre_analysis")
+        if analysis:
+            refresh_genres_if_stale(user_id, doc)
+            return analysis
+
+    return await asyncio.shield(schedule_genre_recompute(user_id))
+
+
+def _user_semaphore(user_id: str) -> asyncio.Semaphore:
+    semaphore = _user_semaphores.get(user_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(USER_SPOTIFY_CONCURRENCY)
+        _user_semaphores[user_id] = semaphore
+    return semaphore
+
+
+async def fetch_top_artists(user_id: str, access_token: str) -> list:
+    """Fetch up to TOP_ARTISTS_LIMIT top artists, requesting pages concurrently.
+
+    Requests are capped per user across overlapping calls, and a page that
+    fails is skipped so the analysis runs on what the others returned.
+    """
+    semaphore = _user_semaphore(user_id)
+    return [
+        artist
+        async for artist in spotify_api.paginate(
+            "/me/top/artists",
+            access_token,
+            {"time_range": "short_term"},
+            page_size=TOP_ARTISTS_PAGE_SIZE,
+            max_items=TOP_ARTISTS_LIMIT,
+            semaphore=semaphore,
+            skip_failed_pages=True,
+        )
+    ]
+
+
+async def analyze_user_genres(user_id: str, access_token: str):
+    started = time.perf_counter()
+    top_artists = await fetch_top_artists(user_id, access_token)
+    fetched = time.perf_counter()
 
     # Extract genres
     flat_genres = []
@@ -79,51 +166,12 @@ def analyze_user_genres(user_id: str, access_token: str):
     raw_highest = wizard.genre_highest(flat_genres)
     sub_genres_raw = wizard.genre_frequency(flat_genres)
 
-    total = sum(raw_highest.values()) or 1
-    meta_genres = {
-        genre: {
-            "portion": round((count / total) * 100, 1),
-            "gradient": get_gradient_for_genre(genre),
-        }
-        for genre, count in raw_highest.items()
-    }
+    result = wizard.build_genre_analysis(raw_highest, sub_genres_raw)
 
-    try:
-        with open(GENRE_MAP_PATH) as f:
-            genre_map = json.load(f)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Failed to load genre map.")
-
-    sub_genres = {}
-    total_subgenre_count = sum(sub_genres_raw.values()) or 1
-    for genre, count in sub_genres_raw.items():
-        portion = round((count / total_subgenre_count) * 100, 1)
-        parent = genre_map.get(genre.lower(), "other")
-        sub_genres[genre] = {
-            "portion": portion,
-            "parent_genre": parent,
-            "gradient": get_gradient_for_genre(parent),
-        }
-
-    sorted_subs = sorted(sub_genres.items(), key=lambda x: -x[1]["portion"])
-    top_sub = next(
-        (g for g, _ in sorted_subs if genre_map.get(g.lower(), "") != g.lower()),
-        sorted_subs[0][0] if sorted_subs else None,
-    )
-    top_meta = genre_map.get(top_sub.lower(), "other") if top_sub else None
-
-    result = {
-        "sub_genres": dict(sorted(sub_genres.items(), key=lambda x: -x[1]["portion"])[:10]),
-        "meta_genres": dict(sorted(meta_genres.items(), key=lambda x: -x[1]["portion"])[:10]),
-        "top_subgenre": {
-            "sub_genre": top_sub,
-            "parent_genre": top_meta,
-            "gradient": get_gradient_for_genre(top_meta),
-        },
-    }
+    aggregated = time.perf_counter()
 
-    users_collection.update_one(
-        {"user_id": user_id},
+    await update_user(
+        user_id,
         {
             "$set": {
                 "genre_analysis": result,
@@ -132,5 +180,18 @@ def analyze_user_genres(user_id: str, access_token: str):
         },
         upsert=True,
     )
+    persisted = time.perf_counter()
+
+    timings = {
+        "fetch": (fetched - started) * 1000,
+        "aggregate": (aggregated - fetched) * 1000,
+        "persist": (persisted - aggregated) * 1000,
+    }
+    for phase, ms in timings.items():
+        metrics.observe(f"genres.{phase}_ms", ms)
+    print(
+        f"⏱️ Genre analysis for {user_id}: "
+        + ", ".join(f"{phase}={ms:.0f}ms" for phase, ms in timings.items())
+    )
 
     return result
\ No newline at end of file
@@ -1,130 +1,145 @@
 # api/playback.py
 from fastapi import APIRouter, Query, Depends, HTTPException, Request
-import spotipy
-from db.mongo import users_collection
+from fastapi.responses import StreamingResponse
+from core.responses import dumps
+from services.spotify_api import SpotifyAPIError, spotify_api
+from services.rate_limit import SpotifyRateLimited
+from services.playback_store import get_last_played, record_last_played
 from services.token import get_token
 from services.spotify import build_track_data
+from services.playback_stream import subscribe_playback, unsubscribe_playback
+import asyncio
 
 router = APIRouter(tags=["playback"])
 
+# Comment lines keep idle streams open through proxies
+STREAM_KEEPALIVE_SECONDS = 15
+
 @router.get("/playback")
-def get_playback_state(request: Request, access_token: str = Depends(get_token)):
+async def get_playback_state(request: Request, access_token: str = Depends(get_token)):
     user_id = request.cookies.get("sinatra_user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing sinatra_user_id cookie")
 
-    sp = spotipy.Spotify(auth=access_token)
-
     try:
-        playback = sp.current_playback()
+        playback = await spotify_api.current_playback(access_token)
 
         if playback and playback.get("item"):
-            track_data = build_track_data(playback["item"], sp)
+            track_data = await build_track_data(playback["item"], access_token)
 
-            existing = users_collection.find_one({"user_id": user_id}, {"last_played_track": 1})
-            if existing and existing.get("last_played_track", {}).get("id") == track_data["id"]:
-                print("🟡 Track already stored, skipping update.")
+            if not record_last_played(user_id, track_data):
                 return {"status": "unchanged", "track": track_data}
-
-            users_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"last_played_track": track_data}}
-            )
             return {"playback": track_data}
         else:
-            user = users_collection.find_one({"user_id": user_id})
-            return {"playback": user.get("last_played_track", None)}
+            return {"playback": await get_last_played(user_id)}
 
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/recently-played")
-def get_recently_played(request: Request, access_token: str = Depends(get_token), limit: int = 1):
-    sp = spotipy.Spotify(auth=access_token)
-
+async def get_recently_played(request: Request, access_token: str = Depends(get_token), limit: int = 1):
     try:
-        recent = sp.current_user_recently_played(limit=limit)
+        recent = await spotify_api.current_user_recently_played(access_token, limit=limit)
         if not recent["items"]:
             return {"track": None}
 
         track = recent["items"][0]["track"]
-        track_data = build_track_data(track, sp)
+        track_data = await build_track_data(track, access_token)
 
         user_id = request.cookies.get("sinatra_user_id")
-        if user_id:
-            existing = users_collection.find_one({"user_id": user_id}, {"last_played_track": 1})
-            if existing and existing.get("last_played_track", {}).get("id") == track_data["id"]:
-                print("🟡 Track already stored, skipping update.")
-                return {"status": "unchanged", "track": track_data}
-            users_collection.update_one(
-                {"user_id": user_id},
-                {"$set": {"last_played_track": track_data}}
-            )
+        if user_id and not record_last_played(user_id, track_data):
+            return {"status": "unchanged", "track": track_data}
 
         return {"track": track_data}
 
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         print(f"⚠️ Recently played error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch recently played track")
 
 
 @router.get("/now-playing")
-def now_playing(request: Request, access_token: str = Depends(get_token)):
-    sp = spotipy.Spotify(auth=access_token)
-
+async def now_playing(request: Request, access_token: str = Depends(get_token)):
     try:
-        current = sp.current_playback()
+        current = await spotify_api.current_playback(access_token)
         if not current or not current.get("item"):
             return {"track": None}
 
         track = current["item"]
-        track_data = build_track_data(track, sp)
+        track_data = await build_track_data(track, access_token)
         
         return {"track": track_data}
 
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         print(f"⚠️ Now playing error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch now playing track")
 
 
 @router.post("/update-playing")
-def update_playing(request: Request, access_token: str = Depends(get_token)):
+async def update_playing(request: Request, access_token: str = Depends(get_token)):
     user_id = request.cookies.get("sinatra_user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing sinatra_user_id cookie")
 
-    sp = spotipy.Spotify(auth=access_token)
-
     try:
-        current = sp.current_playback()
+        current = await spotify_api.current_playback(access_token)
         if not current or not current.get("item"):
             raise HTTPException(status_code=404, detail="Nothing is currently playing")
 
-        track_data = build_track_data(current["item"], sp)
+        track_data = await build_track_data(current["item"], access_token)
 
-        existing = users_collection.find_one({"user_id": user_id}, {"last_played_track": 1})
-        if existing and existing.get("last_played_track", {}).get("id") == track_data["id"]:
-            print("🟡 Track already stored, skipping update.")
+        if not record_last_played(user_id, track_data):
             return {"status": "unchanged", "track": track_data}
 
-        users_collection.update_one(
-            {"user_id": user_id},
-            {"$set": {"last_played_track": track_data}}
-        )
-
         return {"status": "updated", "track": track_data}
 
+    except (SpotifyAPIError, SpotifyRateLimited):
+        raise
     except Exception as e:
         print(f"⚠️ Update playing error: {e}")
         raise HTTPException(status_code=500, detail="Failed to update last played track")
 
 
 @router.get("/check-recent")
-def check_recent_track(request: Request):
+async def check_recent_track(request: Request):
+    user_id = request.cookies.get("sinatra_user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="Missing sinatra_user_id cookie")
+
+    return {"track": await get_last_played(user_id)}
+
+
+@router.get("/playback/stream")
+async def stream_playback(request: Request):
+    """Server-sent events with the user's current track, pushed only when it changes.
+
+    Every open tab shares one server-side poller per user.
+    """
     user_id = request.cookies.get("sinatra_user_id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing sinatra_user_id cookie")
 
-    user = users_collection.find_one({"user_id": user_id})
-    return {"track": user.get("last_played_track")}
\ No newline at end of file
+    async def events():
+        queue = subscribe_playback(user_id)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: playback\ndata: {dumps(event).decode()}\n\n"
+        finally:
+            unsubscribe_playback(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
@@ -1,27 +1,38 @@
 # api/playlists.py
+import asyncio
 from fastapi import APIRouter, Query, HTTPException, Body
 from models.shared import CookiePayload, UserIdPayload, OnboardingPayload
 from models.playlists import PlaylistSummary, PlaylistID, SaveAllPlaylistsRequest, FeaturedPlaylistsUpdateRequest
 from typing import List
-import spotipy
 from fastapi import Request, Depends
-from services.token import get_token
+from services.token import get_token, get_token_by_user_id
+from services.spotify_api import spotify_api
+from services.spotify import enrich_playlists
+from core.responses import FastJSONResponse
 from models.playlists import FeaturedPlaylistsUpdateRequest
 
-from db.mongo import users_collection, playlists_collection
-from services.token import get_token
+from db.users import find_user_profile
+from db.pagination import InvalidCursor
+from db.playlists import count_synced_playlists, find_synced_playlists, page_synced_playlists
+from db.profile_playlists import (
+    add_profile_playlists,
+    count_profile_playlists,
+    find_profile_playlists,
+    page_profile_playlists,
+    remove_profile_playlists,
+    set_featured_playlists,
+)
 
 router = APIRouter(tags=["playlists"])
 
 @router.get("/playlists")
-def get_playlists(
+async def get_playlists(
     user_id: str = Query(...),
     limit: int = Query(50, ge=1, le=50),
     offset: int = Query(0, ge=0),
 ):
-    access_token = get_token(user_id)
-    sp = spotipy.Spotify(auth=access_token)
-    raw = sp.current_user_playlists(limit=limit, offset=offset)
+    access_token = await get_token_by_user_id(user_id)
+    raw = await spotify_api.current_user_playlists(access_token, limit=limit, offset=offset)
 
     playlists = [
         {
@@ -38,12 +49,25 @@ def get_playlists(
 
 
 @router.get("/all-playlists")
-def get_all_user_playlists(user_id: str = Query(...)):
-    user = users_collection.find_one({"user_id": user_id}, {"playlists.all": 1})
-    if not user or "playlists.all" not in user:
-        return []
+async def get_all_user_playlists(user_id: str = Query(...)):
+    return FastJSONResponse(await find_profile_playlists(user_id))
 
-    return user["playlists.all"]
+
+@router.get("/all-playlists/paginated")
+async def get_paginated_user_playlists(
+    user_id: str = Query(...),
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+):
+    """Profile playlists in the order they were added; pass back ``next_cursor`` for more."""
+    try:
+        total, (playlists, next_cursor) = await asyncio.gather(
+            count_profile_playlists(user_id), page_profile_playlists(user_id, cursor, limit)
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse({"total": total, "playlists": playlists, "next_cursor": next_cursor})
 
 
 @router.post("/add-playlists")
@@ -64,32 +88,20 @@ async def add_playlists(
     if not isinstance(playlists, list) or not all("id" in p for p in playlists):
         raise HTTPException(status_code=400, detail="Invalid playlist data")
 
-    sp = spotipy.Spotify(auth=access_token)
-    enriched = []
-
-    for pl in playlists:
-        try:
-            playlist = sp.playlist(pl["id"])
-            enriched.append({
-                "id": pl["id"],
-                "name": playlist["name"],
-                "image": playlist["images"][0]["url"] if playlist["images"] else None,
-                "tracks": playlist["tracks"]["total"],
-                "external_url": playlist["external_urls"]["spotify"],
-            })
-        except Exception as e:
-            print(f"⚠️ Failed to fetch metadata for playlist {pl['id']}: {e}")
+    enriched, failed = await enrich_playlists(access_token, user_id, playlists)
 
     if not enriched:
-        raise HTTPException(status_code=400, detail="No valid playlists to add")
+        raise HTTPException(
+            status_code=400, detail={"message": "No valid playlists to add", "failed": failed}
+        )
 
-    result = users_collection.update_one(
-        {"user_id": user_id},
-        {"$addToSet": {"playlists.all": {"$each": enriched}}},
-        upsert=True,
-    )
+    result = await add_profile_playlists(user_id, enriched)
 
-    return {"status": "added", "modified_count": result.modified_count}
+    return {
+        "status": "added",
+        "modified_count": result.upserted_count + result.modified_count,
+        "failed": failed,
+    }
 
 
 @router.post("/delete-playlists")
@@ -113,16 +125,13 @@ async def delete_playlists(
     playlist_ids = [p["id"] for p in playlists]
     print(f"🗑️ Deleting playlists {playlist_ids} for user {user_id}")
 
-    result = users_collection.update_one(
-        {"user_id": user_id},
-        {"$pull": {"playlists.all": {"id": {"$in": playlist_ids}}}},
-    )
+    result = await remove_profile_playlists(user_id, playlist_ids)
 
-    return {"status": "deleted", "deleted_count": result.modified_count}
+    return {"status": "deleted", "deleted_count": result.deleted_count}
 
 
 @router.post("/update-featured")
-def update_featured_playlists(data: FeaturedPlaylistsUpdateRequest = Body(...)):
+async def update_featured_playlists(data: FeaturedPlaylistsUpdateRequest = Body(...)):
     user_id = data.user_id
     playlist_ids = data.playlist_ids
 
@@ -132,26 +141,17 @@ def update_featured_playlists(data: FeaturedPlaylistsUpdateRequest = Body(...)):
     if not user_id or not isinstance(playlist_ids, list):
         raise HTTPException(status_code=400, detail="Invalid input")
 
-    user = users_collection.find_one({"user_id": user_id})
-    if not user:
+    if await find_user_profile(user_id) is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    all_playlists = user.get("playlists", {}).get("all", [])
-    known_ids = {pl.get("id") for pl in all_playlists}
-
-    normalized_ids = [pid for pid in playlist_ids if pid in known_ids]
-
-    users_collection.update_one(
-        {"user_id": user_id}, {"$set": {"playlists.featured": normalized_ids}}
-    )
+    normalized_ids = await set_featured_playlists(user_id, playlist_ids)
 
     return {"status": "ok", "count": len(normalized_ids)}
 
 @router.get("/playlist-info")
-def get_playlist_info(user_id: str = Query(...), playlist_id: str = Query(...)):
-    access_token = get_token(user_id)
-    sp = spotipy.Spotify(auth=access_token)
-    playlist = sp.playlist(playlist_id)
+async def get_playlist_info(user_id: str = Query(...), playlist_id: str = Query(...)):
+    access_token = await get_token_by_user_id(user_id)
+    playlist = await spotify_api.playlist(access_token, playlist_id)
 
     return {
         "name": playlist["name"],
@@ -160,27 +160,57 @@ def get_playlist_info(user_id: str = Query(...), playlist_id: str = Query(...)):
 
 
 @router.get("/user-playlists")
-def get_user_playlists(user_id: str = Query(...)):
-    doc = playlists_collection.find_one({"user_id": user_id})
-    if not doc:
+async def get_user_playlists(user_id: str = Query(...)):
+    playlists = await find_synced_playlists(user_id)
+    if not playlists:
         raise HTTPException(
             status_code=404, detail="No synced playlists found for user."
         )
 
-    return {
-        "user_id": doc["user_id"],
-        "last_updated": doc.get("last_updated"),
-        "playlists": doc.get("playlists", []),
-    }
+    synced_at = [p.pop("updated_at") for p in playlists if p.get("updated_at")]
+    return FastJSONResponse(
+        {
+            "user_id": user_id,
+            "last_updated": max(synced_at, default=None),
+            "playlists": playlists,
+        }
+    )
+
+@router.get("/user-playlists/search")
+async def search_user_playlists(
+    user_id: str = Query(...),
+    q: str = Query("", max_length=100),
+    sort: str = Query("tracks", pattern="^(tracks|name)$"),
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+):
+    """Synced playlists whose name starts with ``q``, one page at a time."""
+    name_prefix = q.strip()
+    try:
+        total, (playlists, next_cursor) = await asyncio.gather(
+            count_synced_playlists(user_id, name_prefix),
+            page_synced_playlists(user_id, sort, cursor, limit, name_prefix),
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse({"total": total, "playlists": playlists, "next_cursor": next_cursor})
 
 @router.get("/synced-playlists/paginated")
-def get_paginated_playlists(user_id: str = Query(...), offset: int = 0, limit: int = 50):
-    doc = playlists_collection.find_one({"user_id": user_id})
-    if not doc:
+async def get_paginated_playlists(
+    user_id: str = Query(...),
+    sort: str = Query("tracks", pattern="^(tracks|name)$"),
+    cursor: str | None = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+):
+    """Synced playlists by track count or name; pass back ``next_cursor`` for more."""
+    try:
+        total, (playlists, next_cursor) = await asyncio.gather(
+            count_synced_playlists(user_id), page_synced_playlists(user_id, sort, cursor, limit)
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not total:
         raise HTTPException(status_code=404, detail="No synced playlists found.")
-    
-    all_playlists = doc.get("playlists", [])
-    total = len(all_playlists)
-    sliced = all_playlists[offset : offset + limit]
 
-    return {"total": total, "playlists": sliced}
\ No newline at end of file
+    return FastJSONResponse({"total": total, "playlists": playlists, "next_cursor": next_cursor})
\ No newline at end of file
@@ -1,52 +1,34 @@
 # api/public.py
-from fastapi import APIRouter, HTTPException, Query
-from db.mongo import users_collection
+from fastapi import APIRouter, HTTPException, Query, Request
+from db.profile_playlists import find_public_profile
+from db.users import find_genre_analysis, find_last_played
+from services.response_cache import cached_json_response, public_cache
 
 router = APIRouter(tags=["public"])
 
-def _build_profile_response(user_id: str):
+async def _build_profile_response(user_id: str):
     """Return the public profile document for the given user."""
-    doc = users_collection.find_one({"user_id": user_id})
+    doc = await find_public_profile(user_id)
     if not doc:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    playlists_data = doc.get("playlists", {})
-    all_playlists = playlists_data.get("all", [])
-    featured_ids = playlists_data.get("featured", [])
-
-    playlist_lookup = {pl.get("id") or pl.get("playlist_id"): pl for pl in all_playlists}
-    featured_playlists = [playlist_lookup.get(pid) for pid in featured_ids if pid in playlist_lookup]
-
-    genres_data = doc.get("genres_analysis") or doc.get("genres")
-    last_played = doc.get("last_played_track", {})
 
     return {
         "user_id": doc.get("user_id"),
         "display_name": doc.get("display_name"),
         "profile_picture": doc.get("profile_image_url") or doc.get("profile_picture"),
         "playlists": {
-            "all": all_playlists,
-            "featured": featured_playlists,
+            "all": doc["all"],
+            "featured": doc["featured"],
+            "total": doc["total"],
+            "next_cursor": doc["next_cursor"],
         },
         "genres": doc.get("genre_analysis"),
-        "last_played": last_played,
+        "last_played": doc.get("last_played_track", {}),
     }
 
 
-@router.get("/public-profile/{user_id}")
-def get_public_profile(user_id: str):
-    """Fetch a user's public profile via path parameter."""
-    return _build_profile_response(user_id)
-
-
-@router.get("/public-profile")
-def get_public_profile_query(user_id: str = Query(...)):
-    """Fetch a user's public profile via query parameter."""
-    return _build_profile_response(user_id)
-
-@router.get("/public-track/{user_id}")
-def get_public_track(user_id: str):
-    doc = users_collection.find_one({"user_id": user_id}, {"last_played_track": 1})
+async def _build_track_response(user_id: str):
+    doc = await find_last_played(user_id)
     if not doc:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -61,9 +43,33 @@ def get_public_track(user_id: str):
 
     return {"track": track}
 
-@router.get("/public-genres/{user_id}")
-def get_public_genres(user_id: str):
-    doc = users_collection.find_one({"user_id": user_id})
+
+async def _build_genres_response(user_id: str):
+    doc = await find_genre_analysis(user_id)
     if not doc or "genre_analysis" not in doc:
         raise HTTPException(status_code=404, detail="No genre data found")
-    return doc["genre_analysis"]
\ No newline at end of file
+    return doc["genre_analysis"]
+
+
+@router.get("/public-profile/{user_id}")
+async def get_public_profile(request: Request, user_id: str):
+    """Fetch a user's public profile via path parameter."""
+    cached = await public_cache.get_or_build("profile", user_id, lambda: _build_profile_response(user_id))
+    return cached_json_response(request, cached)
+
+
+@router.get("/public-profile")
+async def get_public_profile_query(request: Request, user_id: str = Query(...)):
+    """Fetch a user's public profile via query parameter."""
+    cached = await public_cache.get_or_build("profile", user_id, lambda: _build_profile_response(user_id))
+    return cached_json_response(request, cached)
+
+@router.get("/public-track/{user_id}")
+async def get_public_track(request: Request, user_id: str):
+    cached = await public_cache.get_or_build("track", user_id, lambda: _build_track_response(user_id))
+    return cached_json_response(request, cached)
+
+@router.get("/public-genres/{user_id}")
+async def get_public_genres(request: Request, user_id: str):
+    cached = await public_cache.get_or_build("genres", user_id, lambda: _build_genres_response(user_id))
+    return cached_json_response(request, cached)
\ No newline at end of file
@@ -1,50 +1,43 @@
 # api/spotify.py
 from fastapi import APIRouter, Query, Depends, HTTPException
-from spotipy.exceptions import SpotifyException
-import spotipy
+from services.spotify_api import spotify_api, SpotifyAPIError
 
-from services.token import get_token
-from services.spotify_auth import get_artist_genres
+from services.token import get_token, get_token_by_user_id
+from services.artists import collect_artist_ids, resolve_artist_genres
+from services.spotify import simplify_track_with_genres
 
 router = APIRouter(tags=["spotify"])
 
 
 @router.get("/top-tracks")
-def get_top_tracks(
+async def get_top_tracks(
     access_token: str = Depends(get_token),
     limit: int = 10,
     time_range: str = "medium_term",
 ):
-    sp = spotipy.Spotify(auth=access_token)
-    top_tracks = sp.current_user_top_tracks(limit=limit, time_range=time_range)
-
-    artist_genre_cache = {}
-    simplified = []
-
-    for track in top_tracks["items"]:
-        genres = get_artist_genres(sp, track["artists"], artist_genre_cache)
-
-        simplified.append(
-            {
-                "name": track["name"],
-                "artists": [a["name"] for a in track["artists"]],
-                "album": track["album"]["name"],
-                "external_url": track["external_urls"]["spotify"],
-                "isrc": track.get("external_ids", {}).get("isrc"),
-                "genres": genres,
-            }
-        )
+    top_tracks = await spotify_api.current_user_top_tracks(
+        access_token, limit=limit, time_range=time_range
+    )
+
+    genre_map = await resolve_artist_genres(
+        access_token, collect_artist_ids(top_tracks["items"])
+    )
+    simplified = [
+        simplify_track_with_genres(track, genre_map) for track in top_tracks["items"]
+    ]
 
     return {"top_tracks": simplified}
 
 
 @router.get("/spotify-me")
-def get_spotify_me(user_id: str = Query(...)):
+async def get_spotify_me(user_id: str = Query(...)):
     try:
-        access_token = get_token(user_id)
-        sp = spotipy.Spotify(auth=access_token)
-        return sp.current_user()
-    except SpotifyException as e:
+        access_token = await get_token_by_user_id(user_id)
+        return await spotify_api.current_user(access_token)
+    except SpotifyAPIError as e:
+        if e.status_code == 429 or e.status_code >= 500:
+            # Rate limiting and Spotify outages are not auth failures
+            raise
         print(f"⚠️ Spotify /me error for {user_id}: {e}")
         raise HTTPException(
             status_code=401, detail="Failed to fetch Spotify user profile."
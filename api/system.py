@@ -1,29 +1,24 @@
 # api/system.py
 from fastapi import APIRouter, FastAPI
-from db.mongo import client
 from datetime import datetime
-from pymongo.errors import ConnectionFailure
+from starlette.concurrency import run_in_threadpool
 import os, requests
 from fastapi import Request, HTTPException, Query
 from fastapi.responses import RedirectResponse
-from db.mongo import users_collection, playlists_collection
+from db.ping import check_mongo_connection
 from fastapi.responses import JSONResponse, PlainTextResponse
 
 
 router = APIRouter(tags=["system"])
 
 @router.get("/status")
-def get_system_status():
+async def get_system_status():
     # Mongo
-    try:
-        client.admin.command("ping")
-        mongo_status = "online"
-    except ConnectionFailure:
-        mongo_status = "offline"
+    mongo_status = "online" if await check_mongo_connection() else "offline"
 
     # Spotify
     try:
-        res = requests.get("https://api.spotify.com/v1", timeout=2)
+        res = await run_in_threadpool(requests.get, "https://api.spotify.com/v1", timeout=2)
         spotify_status = "online" if res.status_code == 200 else "degraded"
     except Exception:
         spotify_status = "offline"
@@ -31,7 +26,7 @@ def get_system_status():
     # Vercel (ping frontend)
     frontend_url = os.getenv("PRO_FRONTEND_URL", "https://sinatra.live")
     try:
-        res = requests.get(frontend_url, timeout=2)
+        res = await run_in_threadpool(requests.get, frontend_url, timeout=2)
         vercel_status = "online" if res.status_code == 200 else "degraded"
     except Exception:
         vercel_status = "offline"
@@ -45,5 +40,5 @@ def get_system_status():
     }
 
 @router.get("/", response_class=PlainTextResponse, include_in_schema=False)
-def health_check():
+async def health_check():
     return "Sinatra backend is alive."
\ No newline at end of file
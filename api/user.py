@@ -1,44 +1,38 @@
 # api/user.py
+import os
+from typing import AsyncIterator, Optional
 from fastapi import APIRouter, Request, HTTPException, Query, Body
-from db.mongo import users_collection
-from services.token import get_token
+from fastapi.responses import JSONResponse, StreamingResponse
+from core.responses import FastJSONResponse, dumps
+from db.users import find_user_profile, iter_user_summaries, page_user_summaries, update_user, remove_user
+from db.playlists import remove_synced_playlists
+from db.profile_playlists import remove_all_profile_playlists, replace_profile_playlists
+from services.token import get_token, get_token_by_user_id, forget_token
+from services.spotify_api import SpotifyAPIError, spotify_api
+from services.rate_limit import SpotifyRateLimited
+from services.spotify import enrich_playlists
+from services.artists import resolve_artist_genres
 from datetime import datetime
-import spotipy
-from fastapi import APIRouter
-from db.mongo import client
-from datetime import datetime
-from pymongo.errors import ConnectionFailure
-import os, requests
-from fastapi import Request, HTTPException, Query
-from fastapi.responses import RedirectResponse
-from db.mongo import users_collection, playlists_collection
-from fastapi.responses import JSONResponse
-
-router = APIRouter(tags=["user"])
 
-
-# api/user.py
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
-from db.mongo import users_collection
-import spotipy
+# Users read from Mongo and written to the client per chunk when streaming /users
+USERS_STREAM_BATCH_SIZE = int(os.getenv("USERS_STREAM_BATCH_SIZE", "500"))
+USERS_PAGE_MAX = 1000
 
 router = APIRouter()
 
 @router.get("/me")
-def get_me(request: Request):
+async def get_me(request: Request):
     user_id = request.cookies.get("sinatra_user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Missing sinatra_user_id cookie")
 
-    user = users_collection.find_one({"user_id": user_id})
+    user = await find_user_profile(user_id)
 
     if not user or "display_name" not in user:
         # Attempt auto-registration via Spotify API
         try:
-            access_token = get_token(request)
-            sp = spotipy.Spotify(auth=access_token)
-            sp_user = sp.current_user()
+            access_token = await get_token(request)
+            sp_user = await spotify_api.current_user(access_token)
 
             display_name = sp_user["display_name"]
             profile_image = (
@@ -51,11 +45,11 @@ def get_me(request: Request):
                 "profile_image_url": profile_image,
                 "theme": "default",
             }
-            users_collection.update_one(
-                {"user_id": user_id}, {"$set": new_user}, upsert=True
-            )
+            await update_user(user_id, {"$set": new_user}, upsert=True)
             return new_user
 
+        except (SpotifyAPIError, SpotifyRateLimited):
+            raise
         except Exception as e:
             print(f"⚠️ Failed to auto-register user {user_id}: {e}")
             raise HTTPException(status_code=404, detail="User not found and cannot be registered")
@@ -68,17 +62,50 @@ def get_me(request: Request):
     }
 
 
+async def _stream_users(
+    after: Optional[str], ndjson: bool, limit: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    first = True
+    if not ndjson:
+        yield b"["
+    async for batch in iter_user_summaries(after, USERS_STREAM_BATCH_SIZE, limit):
+        if ndjson:
+            yield b"".join(dumps(user) + b"\n" for user in batch)
+        else:
+            chunk = b",".join(dumps(user) for user in batch)
+            yield chunk if first else b"," + chunk
+        first = False
+    if not ndjson:
+        yield b"]"
+
+
 @router.get("/users")
-def get_users():
-    return list(
-        users_collection.find(
-            {}, {"_id": 0, "user_id": 1, "display_name": 1, "email": 1}
+async def get_users(
+    after: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=USERS_PAGE_MAX),
+    fmt: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+):
+    """Users in user_id order.
+
+    With ``limit`` returns one page and the ``next_after`` to pass back;
+    otherwise streams every user after ``after`` as a JSON array. With
+    ``format=ndjson`` users are streamed one per line, ``limit`` of them if
+    given; the last line's user_id is the next ``after``.
+    """
+    if fmt == "ndjson":
+        return StreamingResponse(
+            _stream_users(after, ndjson=True, limit=limit), media_type="application/x-ndjson"
         )
-    )
+    if limit is None:
+        return StreamingResponse(_stream_users(after, ndjson=False), media_type="application/json")
+
+    users = await page_user_summaries(after, limit + 1)
+    next_after = users[limit - 1]["user_id"] if len(users) > limit else None
+    return FastJSONResponse({"users": users[:limit], "next_after": next_after})
 
 
 @router.post("/register")
-def register_user(data: dict = Body(...)):
+async def register_user(data: dict = Body(...)):
     user_id = data.get("user_id") or data.get("id")
     if not user_id:
         raise HTTPException(status_code=400, detail="Missing user_id")
@@ -88,50 +115,29 @@ def register_user(data: dict = Body(...)):
     selected_playlists = data.get("selected_playlists", [])
     featured_ids = [p.get("id") for p in data.get("featured_playlists", [])]
 
-    sp = spotipy.Spotify(auth=get_token(user_id))
+    access_token = await get_token_by_user_id(user_id)
 
-    enriched = []
-    for pl in selected_playlists:
-        try:
-            playlist = sp.playlist(pl["id"])
-            enriched.append(
-                {
-                    "id": pl["id"],
-                    "name": playlist["name"],
-                    "image": (
-                        playlist["images"][0]["url"] if playlist["images"] else None
-                    ),
-                    "tracks": playlist["tracks"]["total"],
-                    "external_url": playlist["external_urls"]["spotify"],
-                }
-            )
-        except Exception as e:
-            print(f"⚠️ Failed to enrich playlist {pl['id']}: {e}")
-            continue
+    enriched, failed_playlists = await enrich_playlists(access_token, user_id, selected_playlists)
 
     user_doc = {
         "user_id": user_id,
         "display_name": display_name,
         "profile_picture": profile_picture,
-        "playlists": {
-            "all": enriched,
-            "featured": featured_ids,
-        },
         "created_at": datetime.utcnow(),
         "registered": True,
     }
 
-    users_collection.update_one({"user_id": user_id}, {"$set": user_doc}, upsert=True)
+    await update_user(user_id, {"$set": user_doc}, upsert=True)
+    await replace_profile_playlists(user_id, enriched, featured_ids)
 
     # Optional: trigger last_played and genre analysis (import locally)
     try:
         from services.music.wizard import genre_highest
-        from api.genres import get_genres
 
-        playback = sp.current_playback()
+        playback = await spotify_api.current_playback(access_token)
         if playback and playback.get("item"):
             artist = playback["item"]["artists"][0]
-            artist_data = sp.artist(artist["id"])
+            genre_map = await resolve_artist_genres(access_token, [artist["id"]])
             track_data = {
                 "track": {
                     "id": playback["item"]["id"],
@@ -144,31 +150,37 @@ def register_user(data: dict = Body(...)):
                         if playback["item"]["album"]["images"]
                         else None
                     ),
-                    "genres": artist_data.get("genres", []),
+                    "genres": genre_map.get(artist["id"], []),
                 }
             }
-            users_collection.update_one(
-                {"user_id": user_id}, {"$set": {"last_played_track": track_data}}
-            )
+            await update_user(user_id, {"$set": {"last_played_track": track_data}})
     except Exception as e:
         print("⚠️ Playback fetch failed:", e)
 
     try:
-        get_genres(user_id=user_id, refresh=True)
+        from api.genres import get_genre_analysis
+
+        await get_genre_analysis(user_id, refresh=True)
     except Exception as e:
         print("⚠️ Genre analysis failed during registration:", e)
 
-    return {"status": "success", "message": "User registered and initialized"}
+    return {
+        "status": "success",
+        "message": "User registered and initialized",
+        "failed_playlists": failed_playlists,
+    }
 
 @router.delete("/delete-user")
-def delete_user(
+async def delete_user(
     request: Request,
     user_id: str = Query(...),
 ):
     print(f"🗑️ Deleting user: {user_id}")
 
-    users_collection.delete_one({"user_id": user_id})
-    playlists_collection.delete_one({"user_id": user_id})
+    await remove_user(user_id)
+    forget_token(user_id)
+    await remove_synced_playlists(user_id)
+    await remove_all_profile_playlists(user_id)
 
     response = JSONResponse(content={"status": "deleted"})
     response.delete_cookie("sinatra_user_id", path="/")
@@ -0,0 +1,27 @@
+# core/errors.py
+import math
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from services.rate_limit import SpotifyRateLimited
+from services.spotify_api import SpotifyAPIError
+
+
+def _rate_limited(retry_after) -> JSONResponse:
+    seconds = max(1, math.ceil(retry_after or 1))
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Spotify is rate limiting us, try again shortly"},
+        headers={"Retry-After": str(seconds)},
+    )
+
+
+def add_exception_handlers(app: FastAPI):
+    @app.exception_handler(SpotifyRateLimited)
+    async def spotify_rate_limited(request: Request, exc: SpotifyRateLimited):
+        return _rate_limited(exc.retry_after)
+
+    @app.exception_handler(SpotifyAPIError)
+    async def spotify_api_error(request: Request, exc: SpotifyAPIError):
+        if exc.status_code == 429:
+            return _rate_limited(exc.retry_after)
+        return JSONResponse(status_code=502, content={"detail": str(exc)})
\ No newline at end of file
@@ -0,0 +1,49 @@
+# core/lifespan.py
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from db.mongo import connect_mongo, close_mongo
+from db.artists import ensure_artist_genre_indexes
+from db.jobs import ensure_job_indexes
+from db.playlists import ensure_playlist_indexes
+from db.profile_playlists import ensure_profile_playlist_indexes
+from db.users import ensure_user_indexes
+from services.spotify_api import spotify_api
+from services.music.wizard import UNCATEGORIZED_GENRES
+from services.playback_store import close_playback_store
+from services.redis_client import close_redis
+from services.playlist_backfill import resume_playlist_backfills, stop_playlist_backfills
+from services.token_refresher import start_token_refresher, stop_token_refresher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_mongo()
+    # Separately, so one failed build does not leave the other collections unindexed
+    for ensure_indexes in (
+        ensure_user_indexes,
+        ensure_playlist_indexes,
+        ensure_profile_playlist_indexes,
+        ensure_artist_genre_indexes,
+        ensure_job_indexes,
+    ):
+        try:
+            await ensure_indexes()
+        except Exception as e:
+            print(f"⚠️ {ensure_indexes.__name__} failed: {e}")
+
+    start_token_refresher()
+    try:
+        await resume_playlist_backfills()
+    except Exception as e:
+        print(f"⚠️ Failed to resume playlist backfills: {e}")
+
+    try:
+        yield
+    finally:
+        await stop_playlist_backfills()
+        await stop_token_refresher()
+        await close_playback_store()
+        await spotify_api.aclose()
+        await close_redis()
+        close_mongo()
+        UNCATEGORIZED_GENRES.flush()
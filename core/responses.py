@@ -0,0 +1,41 @@
+# core/responses.py
+from typing import Any
+import orjson
+from bson import ObjectId
+from fastapi.encoders import ENCODERS_BY_TYPE
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# Same bytes Starlette's JSONResponse writes (compact, UTF-8), just produced
+# by orjson, which also encodes datetimes, UUIDs and numpy values itself.
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Plain return values still go through jsonable_encoder before any response
+# class renders them; teach it ObjectId too so those routes do not 500
+ENCODERS_BY_TYPE[ObjectId] = str
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson.
+
+    The app default, but FastAPI still runs plain return values through
+    jsonable_encoder first; hot endpoints return this directly to skip that.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
\ No newline at end of file
@@ -0,0 +1,40 @@
+# db/artists.py
+import os
+from datetime import datetime, timezone
+from typing import Dict, List
+from pymongo import UpdateOne
+from db.mongo import get_db
+
+ARTIST_GENRES_TTL = int(os.getenv("ARTIST_GENRES_TTL", str(7 * 24 * 3600)))
+
+
+def _artist_genres():
+    return get_db().artist_genres
+
+
+async def ensure_artist_genre_indexes():
+    await _artist_genres().create_index(
+        "updated_at", expireAfterSeconds=ARTIST_GENRES_TTL, name="artist_genres_ttl"
+    )
+
+
+async def find_artist_genres(artist_ids: List[str]) -> Dict[str, List[str]]:
+    cursor = _artist_genres().find({"_id": {"$in": artist_ids}}, {"genres": 1})
+    return {doc["_id"]: doc.get("genres", []) async for doc in cursor}
+
+
+async def save_artist_genres(genre_map: Dict[str, List[str]]):
+    if not genre_map:
+        return None
+    now = datetime.now(timezone.utc)
+    return await _artist_genres().bulk_write(
+        [
+            UpdateOne(
+                {"_id": artist_id},
+                {"$set": {"genres": genres, "updated_at": now}},
+                upsert=True,
+            )
+            for artist_id, genres in genre_map.items()
+        ],
+        ordered=False,
+    )
\ No newline at end of file
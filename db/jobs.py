@@ -0,0 +1,94 @@
+# db/jobs.py
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from db.mongo import ensure_unique_index, get_db
+
+
+def _jobs():
+    return get_db().jobs
+
+
+def _object_id(job_id: str) -> Optional[ObjectId]:
+    try:
+        return ObjectId(job_id)
+    except (InvalidId, TypeError):
+        return None
+
+
+async def ensure_job_indexes():
+    # Startup looks for running jobs of a kind to resume
+    await _jobs().create_index([("kind", 1), ("status", 1)], name="kind_status")
+    # At most one running job of each kind, however many callers start one at once
+    await ensure_unique_index(
+        _jobs(), "kind", "one_running_per_kind", partialFilterExpression={"status": "running"}
+    )
+
+
+def _new_job_fields(params: Optional[dict], now: datetime) -> dict:
+    return {
+        "params": params or {},
+        "checkpoint": None,
+        "progress": {},
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+async def create_job(kind: str, params: Optional[dict] = None) -> str:
+    now = datetime.now(timezone.utc)
+    result = await _jobs().insert_one({"kind": kind, "status": "running", **_new_job_fields(params, now)})
+    return str(result.inserted_id)
+
+
+async def start_job(kind: str, params: Optional[dict] = None) -> str:
+    """Id of the running job of ``kind``, created in the same write if there is none."""
+    now = datetime.now(timezone.utc)
+    for attempt in range(2):
+        try:
+            job = await _jobs().find_one_and_update(
+                {"kind": kind, "status": "running"},
+                {"$setOnInsert": _new_job_fields(params, now)},
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return str(job["_id"])
+        except DuplicateKeyError:
+            # A concurrent start inserted it first; the retry finds that one
+            if attempt:
+                raise
+
+
+async def find_job(job_id: str) -> Optional[dict]:
+    oid = _object_id(job_id)
+    if oid is None:
+        return None
+    return await _jobs().find_one({"_id": oid})
+
+
+async def find_running_jobs(kind: str) -> list:
+    return await _jobs().find({"kind": kind, "status": "running"}).to_list(length=None)
+
+
+async def checkpoint_job(job_id: str, checkpoint, progress: dict) -> Optional[dict]:
+    """Record the last fully written item and add ``progress`` to the counters."""
+    return await _jobs().find_one_and_update(
+        {"_id": ObjectId(job_id)},
+        {
+            "$set": {"checkpoint": checkpoint, "updated_at": datetime.now(timezone.utc)},
+            "$inc": {f"progress.{key}": value for key, value in progress.items()},
+        },
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+async def finish_job(job_id: str, status: str, error: Optional[str] = None):
+    now = datetime.now(timezone.utc)
+    await _jobs().update_one(
+        {"_id": ObjectId(job_id)},
+        {"$set": {"status": status, "error": error, "updated_at": now, "finished_at": now}},
+    )
\ No newline at end of file
@@ -0,0 +1,23 @@
+# db/locks.py
+import time
+from pymongo.errors import DuplicateKeyError
+from db.mongo import get_db
+
+
+def _locks():
+    return get_db().locks
+
+
+async def acquire_lease(name: str, owner: str, ttl: int) -> bool:
+    """Take or renew a named lease so only one worker runs a periodic job."""
+    now = time.time()
+    try:
+        await _locks().update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + ttl}},
+            upsert=True,
+        )
+        return True
+    except DuplicateKeyError:
+        # Another owner holds an unexpired lease, so the upsert collided
+        return False
\ No newline at end of file
@@ -0,0 +1,77 @@
+# db/migrate_playlists.py
+"""Move embedded playlist arrays into one document per playlist.
+
+    python -m db.migrate_playlists [--keep-embedded]
+
+Copies users.playlists.all/featured into profile_playlists and the legacy
+per-user ``playlists`` documents into synced_playlists, then drops the
+embedded copies. Each user is converted with upserts, so an interrupted run
+can simply be started again. With --keep-embedded the old fields stay, and a
+later run re-imports them over whatever changed in the meantime.
+"""
+import argparse
+import asyncio
+from typing import List, Tuple
+from db.mongo import close_mongo, connect_mongo, get_db
+from db.playlists import apply_synced_playlist_changes, ensure_playlist_indexes
+from db.profile_playlists import ensure_profile_playlist_indexes, replace_profile_playlists
+from db.users import update_user
+
+
+def _unique_entries(entries: list) -> List[dict]:
+    """Entries keyed by "id", first occurrence wins; older ones used playlist_id."""
+    unique = {}
+    for entry in entries or []:
+        playlist_id = entry.get("id") or entry.get("playlist_id")
+        if playlist_id and playlist_id not in unique:
+            unique[playlist_id] = {**entry, "id": playlist_id}
+    return list(unique.values())
+
+
+async def migrate_profile_playlists(keep_embedded: bool) -> Tuple[int, int]:
+    users = playlists = 0
+    async for user in get_db().users.find(
+        {"playlists": {"$exists": True}}, {"_id": 0, "user_id": 1, "playlists": 1}
+    ):
+        embedded = user.get("playlists") or {}
+        entries = _unique_entries(embedded.get("all"))
+        await replace_profile_playlists(user["user_id"], entries, embedded.get("featured") or [])
+        if not keep_embedded:
+            await update_user(user["user_id"], {"$unset": {"playlists": ""}})
+        users += 1
+        playlists += len(entries)
+    return users, playlists
+
+
+async def migrate_synced_playlists(keep_embedded: bool) -> Tuple[int, int]:
+    legacy = get_db().playlists
+    users = playlists = 0
+    async for doc in legacy.find({}, {"_id": 1, "user_id": 1, "playlists": 1}):
+        entries = _unique_entries(doc.get("playlists"))
+        await apply_synced_playlist_changes(doc["user_id"], entries, [], [])
+        if not keep_embedded:
+            await legacy.delete_one({"_id": doc["_id"]})
+        users += 1
+        playlists += len(entries)
+    return users, playlists
+
+
+async def main(keep_embedded: bool):
+    connect_mongo()
+    try:
+        await ensure_playlist_indexes()
+        await ensure_profile_playlist_indexes()
+        users, playlists = await migrate_profile_playlists(keep_embedded)
+        print(f"✅ Moved {playlists} profile playlists for {users} users")
+        users, playlists = await migrate_synced_playlists(keep_embedded)
+        print(f"✅ Moved {playlists} synced playlists for {users} users")
+    finally:
+        close_mongo()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--keep-embedded", action="store_true", help="leave the embedded arrays in place"
+    )
+    asyncio.run(main(parser.parse_args().keep_embedded))
\ No newline at end of file
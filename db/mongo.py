@@ -1,15 +1,59 @@
 # db/mongo.py
 import os
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
 from dotenv import load_dotenv
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("MONGODB_DB", "sinatra")
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+# Created and closed by the app lifespan (core/lifespan.py) so the client is
+# bound to the running event loop instead of being built at import time.
+client: AsyncIOMotorClient | None = None
+db: AsyncIOMotorDatabase | None = None
 
-users_collection = db.users
-playlists_collection = db.playlists
\ No newline at end of file
+
+def connect_mongo() -> AsyncIOMotorDatabase:
+    global client, db
+    if client is None:
+        client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE)
+        db = client[DB_NAME]
+    return db
+
+
+def close_mongo():
+    global client, db
+    if client is not None:
+        client.close()
+    client = None
+    db = None
+
+
+def get_db() -> AsyncIOMotorDatabase:
+    if db is None:
+        raise RuntimeError("MongoDB client is not connected; is the app lifespan running?")
+    return db
+
+
+def get_client() -> AsyncIOMotorClient:
+    if client is None:
+        raise RuntimeError("MongoDB client is not connected; is the app lifespan running?")
+    return client
+
+
+async def ensure_unique_index(collection: AsyncIOMotorCollection, keys, name: str, **options):
+    """Create a unique index, or a plain one under the same name if that fails.
+
+    The unique build fails while duplicate documents exist; queries should
+    still be index scans meanwhile. Once the duplicates are removed, drop the
+    plain index and restart to get the unique one.
+    """
+    try:
+        await collection.create_index(keys, name=name, unique=True, **options)
+    except OperationFailure as e:
+        print(f"⚠️ Unique index {collection.name}.{name} unavailable, using a plain one: {e}")
+        if name not in await collection.index_information():
+            await collection.create_index(keys, name=name, **options)
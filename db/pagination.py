@@ -0,0 +1,78 @@
+# db/pagination.py
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Any, List, Optional, Sequence, Tuple
+
+# (field, direction) pairs; the last field must be unique within the query
+SortSpec = Sequence[Tuple[str, int]]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return {"$date": int(value.timestamp() * 1000)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromtimestamp(value["$date"] / 1000, tz=timezone.utc)
+    return value
+
+
+def encode_cursor(doc: dict, sort: SortSpec) -> str:
+    """Opaque cursor pointing just past ``doc`` in ``sort`` order."""
+    values = [_encode_value(doc.get(field)) for field, _ in sort]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return [_decode_value(v) for v in values]
+
+
+def keyset_filter(sort: SortSpec, values: List[Any]) -> dict:
+    """Match documents strictly after ``values`` in ``sort`` order.
+
+    For [(a, -1), (b, 1)] that is: a < va, or a == va and b > vb.
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort):
+        branch = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        branch[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        branches.append(branch)
+    return {"$or": branches}
+
+
+async def keyset_page(
+    collection, query: dict, sort: SortSpec, projection: dict, cursor: Optional[str], limit: int
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of ``query`` in ``sort`` order, and the cursor for the next page.
+
+    Sort fields are fetched alongside ``projection`` to build the cursor and
+    removed again unless the projection asked for them.
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort))]}
+    fields = {**projection, **{field: 1 for field, _ in sort if field not in projection}}
+    docs = await collection.find(query, fields).sort(list(sort)).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1], sort) if len(docs) > limit else None
+    docs = docs[:limit]
+    for doc in docs:
+        for field, _ in sort:
+            if field not in projection:
+                doc.pop(field, None)
+    return docs, next_cursor
\ No newline at end of file
@@ -1,10 +1,9 @@
-# db/ping.py
 from pymongo.errors import ConnectionFailure
-from db.mongo import client
+from db.mongo import get_client
 
-def check_mongo_connection():
+async def check_mongo_connection():
     try:
-        client.admin.command("ping")
+        await get_client().admin.command("ping")
         return True
     except ConnectionFailure:
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,137 @@
+# db/playlists.py
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, TypedDict
+from pymongo import DeleteMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult
+from db.mongo import ensure_unique_index, get_db
+from db.pagination import SortSpec, keyset_page
+
+
+def _synced():
+    return get_db().synced_playlists
+
+
+class SyncedPlaylist(TypedDict, total=False):
+    id: str
+    name: str
+    tracks: int
+    owner_id: str
+    image: Optional[str]
+    external_url: str
+    snapshot_id: Optional[str]
+
+
+# Stored as playlist_id, served under the "id" key clients already use
+SYNCED_PLAYLIST_FIELDS = {
+    "_id": 0,
+    "id": "$playlist_id",
+    "name": 1,
+    "tracks": 1,
+    "owner_id": 1,
+    "image": 1,
+    "external_url": 1,
+    "snapshot_id": 1,
+}
+
+# Each ends in playlist_id so the order, and with it the cursor, is total
+SYNCED_SORTS: Dict[str, SortSpec] = {
+    "tracks": [("tracks", -1), ("playlist_id", 1)],
+    "name": [("name_lower", 1), ("playlist_id", 1)],
+}
+
+
+async def ensure_playlist_indexes():
+    await ensure_unique_index(_synced(), [("user_id", 1), ("playlist_id", 1)], "user_playlist")
+    # One per SYNCED_SORTS entry, so every page is a bounded index scan
+    await _synced().create_index(
+        [("user_id", 1), ("tracks", -1), ("playlist_id", 1)], name="user_tracks"
+    )
+    await _synced().create_index(
+        [("user_id", 1), ("name_lower", 1), ("playlist_id", 1)], name="user_name"
+    )
+
+
+async def find_synced_playlists(user_id: str) -> List[dict]:
+    """Every synced playlist, largest first, with its ``updated_at``."""
+    return await _synced().find(
+        {"user_id": user_id}, {**SYNCED_PLAYLIST_FIELDS, "updated_at": 1}
+    ).sort(SYNCED_SORTS["tracks"]).to_list(length=None)
+
+
+async def find_synced_playlists_by_ids(user_id: str, playlist_ids: List[str]) -> List[SyncedPlaylist]:
+    return await _synced().find(
+        {"user_id": user_id, "playlist_id": {"$in": playlist_ids}}, SYNCED_PLAYLIST_FIELDS
+    ).to_list(length=None)
+
+
+def _synced_query(user_id: str, name_prefix: Optional[str]) -> dict:
+    query = {"user_id": user_id}
+    if name_prefix:
+        # Anchored and case-folded, so it is a range scan on the user_name index
+        query["name_lower"] = {"$regex": f"^{re.escape(name_prefix.lower())}"}
+    return query
+
+
+async def page_synced_playlists(
+    user_id: str, sort: str, cursor: Optional[str], limit: int, name_prefix: Optional[str] = None
+) -> Tuple[List[SyncedPlaylist], Optional[str]]:
+    return await keyset_page(
+        _synced(),
+        _synced_query(user_id, name_prefix),
+        SYNCED_SORTS[sort],
+        SYNCED_PLAYLIST_FIELDS,
+        cursor,
+        limit,
+    )
+
+
+async def count_synced_playlists(user_id: str, name_prefix: Optional[str] = None) -> int:
+    return await _synced().count_documents(_synced_query(user_id, name_prefix))
+
+
+async def find_synced_snapshots(user_id: str) -> Dict[str, Optional[str]]:
+    """playlist id -> snapshot_id of the user's synced playlists."""
+    docs = await _synced().find(
+        {"user_id": user_id}, {"_id": 0, "playlist_id": 1, "snapshot_id": 1}
+    ).to_list(length=None)
+    return {d["playlist_id"]: d.get("snapshot_id") for d in docs}
+
+
+def _synced_doc(user_id: str, entry: dict, now: datetime) -> dict:
+    doc = {key: value for key, value in entry.items() if key != "id"}
+    return {
+        **doc,
+        "user_id": user_id,
+        "playlist_id": entry["id"],
+        "name_lower": (entry.get("name") or "").lower(),
+        "updated_at": now,
+    }
+
+
+async def apply_synced_playlist_changes(
+    user_id: str, added: List[dict], changed: List[dict], removed_ids: List[str]
+) -> Optional[BulkWriteResult]:
+    """Upsert added and changed playlists and delete removed ones, one document each.
+
+    Does nothing, and costs no round trip, when there is nothing to apply.
+    """
+    if not (added or changed or removed_ids):
+        return None
+
+    now = datetime.now(timezone.utc)
+    ops = [
+        UpdateOne(
+            {"user_id": user_id, "playlist_id": entry["id"]},
+            {"$set": _synced_doc(user_id, entry, now)},
+            upsert=True,
+        )
+        for entry in added + changed
+    ]
+    if removed_ids:
+        ops.append(DeleteMany({"user_id": user_id, "playlist_id": {"$in": removed_ids}}))
+    return await _synced().bulk_write(ops, ordered=False)
+
+
+async def remove_synced_playlists(user_id: str) -> DeleteResult:
+    return await _synced().delete_many({"user_id": user_id})
\ No newline at end of file
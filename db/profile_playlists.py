@@ -0,0 +1,268 @@
+# db/profile_playlists.py
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple, TypedDict
+from pymongo import DeleteMany, UpdateMany, UpdateOne
+from pymongo.results import BulkWriteResult, DeleteResult
+from db.mongo import ensure_unique_index, get_db
+from db.pagination import SortSpec, encode_cursor, keyset_filter, keyset_page
+from db.users import touch_user_playlists
+
+# Playlists /dashboard and /public-profile embed; the rest is paged on demand
+PROFILE_PLAYLIST_PAGE_SIZE = int(os.getenv("PROFILE_PLAYLIST_PAGE_SIZE", "50"))
+
+PROFILE_PLAYLISTS = "profile_playlists"
+
+
+def _profile():
+    return get_db()[PROFILE_PLAYLISTS]
+
+
+class ProfilePlaylist(TypedDict, total=False):
+    id: str
+    name: str
+    image: Optional[str]
+    tracks: int
+    external_url: str
+    snapshot_id: Optional[str]
+
+
+# Stored as playlist_id, served under the "id" key clients already use
+PROFILE_PLAYLIST_FIELDS = {
+    "_id": 0,
+    "id": "$playlist_id",
+    "name": 1,
+    "image": 1,
+    "tracks": 1,
+    "external_url": 1,
+    "snapshot_id": 1,
+}
+
+# Order the user added them in, as the embedded array kept them
+PROFILE_SORT: SortSpec = [("added_at", 1), ("playlist_id", 1)]
+_BY_USER: SortSpec = [("user_id", 1), ("playlist_id", 1)]
+
+
+async def ensure_profile_playlist_indexes():
+    await ensure_unique_index(_profile(), [("user_id", 1), ("playlist_id", 1)], "user_playlist")
+    await _profile().create_index(
+        [("user_id", 1), ("added_at", 1), ("playlist_id", 1)], name="user_added"
+    )
+    await _profile().create_index([("user_id", 1), ("featured_rank", 1)], name="user_featured")
+
+
+def _entry_fields(entry: dict) -> dict:
+    return {key: value for key, value in entry.items() if key not in ("id", "playlist_id")}
+
+
+async def find_profile_playlists(user_id: str) -> List[ProfilePlaylist]:
+    return await _profile().find({"user_id": user_id}, PROFILE_PLAYLIST_FIELDS).sort(
+        PROFILE_SORT
+    ).to_list(length=None)
+
+
+async def page_profile_playlists(
+    user_id: str, cursor: Optional[str], limit: int
+) -> Tuple[List[ProfilePlaylist], Optional[str]]:
+    return await keyset_page(
+        _profile(), {"user_id": user_id}, PROFILE_SORT, PROFILE_PLAYLIST_FIELDS, cursor, limit
+    )
+
+
+async def count_profile_playlists(user_id: str) -> int:
+    return await _profile().count_documents({"user_id": user_id})
+
+
+async def add_profile_playlists(user_id: str, entries: List[dict]) -> Optional[BulkWriteResult]:
+    """Upsert one document per entry; playlists already added keep their position."""
+    if not entries:
+        return None
+    now = datetime.now(timezone.utc)
+    result = await _profile().bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id, "playlist_id": entry["id"]},
+                {
+                    "$set": _entry_fields(entry),
+                    # Millisecond steps keep the request order under one timestamp
+                    "$setOnInsert": {"added_at": now + timedelta(milliseconds=i), "featured_rank": None},
+                },
+                upsert=True,
+            )
+            for i, entry in enumerate(entries)
+        ],
+        ordered=False,
+    )
+    await touch_user_playlists([user_id])
+    return result
+
+
+async def remove_profile_playlists(user_id: str, playlist_ids: List[str]) -> DeleteResult:
+    result = await _profile().delete_many({"user_id": user_id, "playlist_id": {"$in": playlist_ids}})
+    await touch_user_playlists([user_id])
+    return result
+
+
+async def set_featured_playlists(user_id: str, playlist_ids: List[str]) -> List[str]:
+    """Feature the given playlists in order, ignoring ids the user never added.
+
+    Returns the ids actually featured.
+    """
+    known = set(
+        await _profile().distinct("playlist_id", {"user_id": user_id, "playlist_id": {"$in": playlist_ids}})
+    )
+    featured = [pid for pid in dict.fromkeys(playlist_ids) if pid in known]
+    ops = [
+        UpdateMany(
+            {"user_id": user_id, "featured_rank": {"$ne": None}, "playlist_id": {"$nin": featured}},
+            {"$set": {"featured_rank": None}},
+        )
+    ]
+    ops += [
+        UpdateOne({"user_id": user_id, "playlist_id": pid}, {"$set": {"featured_rank": rank}})
+        for rank, pid in enumerate(featured)
+    ]
+    await _profile().bulk_write(ops, ordered=False)
+    await touch_user_playlists([user_id])
+    return featured
+
+
+async def replace_profile_playlists(
+    user_id: str, entries: List[dict], featured_ids: List[str]
+) -> BulkWriteResult:
+    """Make ``entries`` the user's whole profile, featuring ``featured_ids`` among them."""
+    now = datetime.now(timezone.utc)
+    ranks = {pid: rank for rank, pid in enumerate(dict.fromkeys(featured_ids))}
+    ops = [DeleteMany({"user_id": user_id, "playlist_id": {"$nin": [e["id"] for e in entries]}})]
+    ops += [
+        UpdateOne(
+            {"user_id": user_id, "playlist_id": entry["id"]},
+            {
+                "$set": {**_entry_fields(entry), "featured_rank": ranks.get(entry["id"])},
+                "$setOnInsert": {"added_at": now + timedelta(milliseconds=i)},
+            },
+            upsert=True,
+        )
+        for i, entry in enumerate(entries)
+    ]
+    result = await _profile().bulk_write(ops, ordered=True)
+    await touch_user_playlists([user_id])
+    return result
+
+
+async def remove_all_profile_playlists(user_id: str) -> DeleteResult:
+    return await _profile().delete_many({"user_id": user_id})
+
+
+async def list_profile_playlists_after(
+    after: Optional[Tuple[str, str]], limit: int
+) -> List[dict]:
+    """(user_id, playlist_id) pairs in that order, starting after ``after``."""
+    query = keyset_filter(_BY_USER, list(after)) if after else {}
+    return await _profile().find(query, {"_id": 0, "user_id": 1, "playlist_id": 1}).sort(
+        _BY_USER
+    ).limit(limit).to_list(length=limit)
+
+
+async def bulk_update_profile_playlists(
+    updates: List[Tuple[str, str, dict]]
+) -> Optional[BulkWriteResult]:
+    """Set fields on single playlists from (user_id, playlist_id, fields).
+
+    Playlists removed while the caller was working are not recreated.
+    """
+    if not updates:
+        return None
+    result = await _profile().bulk_write(
+        [
+            UpdateOne({"user_id": user_id, "playlist_id": playlist_id}, {"$set": _entry_fields(fields)})
+            for user_id, playlist_id, fields in updates
+        ],
+        ordered=False,
+    )
+    await touch_user_playlists(list({user_id for user_id, _, _ in updates}))
+    return result
+
+
+def _playlist_lookups(limit: int) -> List[dict]:
+    """First page of the user's playlists, the featured ones, and the total count."""
+    return [
+        {
+            "$lookup": {
+                "from": PROFILE_PLAYLISTS,
+                "localField": "user_id",
+                "foreignField": "user_id",
+                "pipeline": [
+                    {"$sort": dict(PROFILE_SORT)},
+                    # One extra tells whether there is a next page
+                    {"$limit": limit + 1},
+                    {"$project": {**PROFILE_PLAYLIST_FIELDS, "added_at": 1, "playlist_id": 1}},
+                ],
+                "as": "all",
+            }
+        },
+        {
+            "$lookup": {
+                "from": PROFILE_PLAYLISTS,
+                "localField": "user_id",
+                "foreignField": "user_id",
+                "pipeline": [
+                    {"$match": {"featured_rank": {"$ne": None}}},
+                    {"$sort": {"featured_rank": 1}},
+                    {"$project": PROFILE_PLAYLIST_FIELDS},
+                ],
+                "as": "featured",
+            }
+        },
+        {
+            "$lookup": {
+                "from": PROFILE_PLAYLISTS,
+                "localField": "user_id",
+                "foreignField": "user_id",
+                "pipeline": [{"$count": "n"}],
+                "as": "playlist_count",
+            }
+        },
+    ]
+
+
+async def _find_with_playlists(user_id: str, fields: dict) -> Optional[dict]:
+    """Project ``fields`` plus the first playlist page and the featured ones in one read."""
+    limit = PROFILE_PLAYLIST_PAGE_SIZE
+    docs = await get_db().users.aggregate(
+        [
+            {"$match": {"user_id": user_id}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "user_id": 1, "version": {"$ifNull": ["$version", 0]}, **fields}},
+            *_playlist_lookups(limit),
+        ]
+    ).to_list(length=1)
+    if not docs:
+        return None
+
+    doc = docs[0]
+    page = doc["all"]
+    doc["next_cursor"] = encode_cursor(page[limit - 1], PROFILE_SORT) if len(page) > limit else None
+    doc["all"] = [{k: v for k, v in p.items() if k not in ("added_at", "playlist_id")} for p in page[:limit]]
+    doc["total"] = doc.pop("playlist_count")[0]["n"] if doc.get("playlist_count") else 0
+    return doc
+
+
+async def find_dashboard(user_id: str) -> Optional[dict]:
+    """Everything /dashboard shows, in one read."""
+    return await _find_with_playlists(
+        user_id, {"genre_analysis": 1, "genre_last_updated": 1, "last_played_track": 1}
+    )
+
+
+async def find_public_profile(user_id: str) -> Optional[dict]:
+    return await _find_with_playlists(
+        user_id,
+        {
+            "display_name": 1,
+            "profile_image_url": 1,
+            "profile_picture": 1,
+            "genre_analysis": 1,
+            "last_played_track": 1,
+        },
+    )
\ No newline at end of file
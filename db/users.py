@@ -0,0 +1,271 @@
+# db/users.py
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple, TypedDict
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult, DeleteResult, UpdateResult
+from db.mongo import ensure_unique_index, get_db
+
+
+def _users():
+    return get_db().users
+
+
+# Awaited with the affected user ids after every write that changes what users see
+_write_listeners: List[Callable[[List[str]], Awaitable[None]]] = []
+
+
+def on_user_write(listener: Callable[[List[str]], Awaitable[None]]):
+    _write_listeners.append(listener)
+    return listener
+
+
+async def _notify_write(user_ids: List[str]):
+    for listener in _write_listeners:
+        try:
+            await listener(user_ids)
+        except Exception as e:
+            print(f"⚠️ User write listener failed: {e}")
+
+
+def _versioned(update: dict) -> dict:
+    """Bump the document version with the write, so readers can tell it changed."""
+    return {**update, "$inc": {**update.get("$inc", {}), "version": 1}}
+
+
+class UserProfile(TypedDict, total=False):
+    user_id: str
+    display_name: str
+    profile_image_url: Optional[str]
+    theme: str
+
+
+class UserSummary(TypedDict, total=False):
+    user_id: str
+    display_name: str
+    email: str
+
+
+class UserTokens(TypedDict, total=False):
+    access_token: str
+    refresh_token: str
+    expires_at: int
+
+
+class StoredGenreAnalysis(TypedDict, total=False):
+    genre_analysis: dict
+    genre_last_updated: datetime
+
+
+class LastPlayed(TypedDict, total=False):
+    last_played_track: dict
+
+
+async def _find_one(user_id: str, projection: dict) -> Optional[dict]:
+    return await _users().find_one({"user_id": user_id}, {"_id": 0, **projection})
+
+
+async def find_user_profile(user_id: str) -> Optional[UserProfile]:
+    return await _find_one(
+        user_id, {"user_id": 1, "display_name": 1, "profile_image_url": 1, "theme": 1}
+    )
+
+
+async def find_genre_analysis(user_id: str) -> Optional[StoredGenreAnalysis]:
+    return await _find_one(user_id, {"genre_analysis": 1, "genre_last_updated": 1})
+
+
+async def find_last_played(user_id: str) -> Optional[LastPlayed]:
+    return await _find_one(user_id, {"last_played_track": 1})
+
+
+USER_SUMMARY_FIELDS = {"_id": 0, "user_id": 1, "display_name": 1, "email": 1}
+
+
+def _after_user(after: Optional[str]) -> dict:
+    return {"user_id": {"$gt": after}} if after else {}
+
+
+async def page_user_summaries(after: Optional[str], limit: int) -> List[UserSummary]:
+    """Up to ``limit`` users in user_id order, starting after ``after``."""
+    return await _users().find(_after_user(after), USER_SUMMARY_FIELDS).sort("user_id", 1).limit(
+        limit
+    ).to_list(length=limit)
+
+
+async def iter_user_summaries(
+    after: Optional[str] = None, batch_size: int = 500, limit: Optional[int] = None
+) -> AsyncIterator[List[UserSummary]]:
+    """Users in user_id order, ``batch_size`` at a time, at most ``limit`` of them.
+
+    Holds at most one batch, so memory stays flat however many users exist.
+    """
+    cursor = _users().find(_after_user(after), USER_SUMMARY_FIELDS).sort("user_id", 1)
+    if limit is not None:
+        cursor = cursor.limit(limit)
+    batch = []
+    async for doc in cursor.batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def update_user(user_id: str, update: dict, upsert: bool = False) -> UpdateResult:
+    result = await _users().update_one({"user_id": user_id}, _versioned(update), upsert=upsert)
+    await _notify_write([user_id])
+    return result
+
+
+async def bulk_set_last_played_tracks(tracks: List[Tuple[str, dict]]) -> Optional[BulkWriteResult]:
+    """Store each (user_id, track) unless it is already that user's stored track.
+
+    Listeners only hear about the batch when some document actually changed.
+    """
+    if not tracks:
+        return None
+    user_ids = [user_id for user_id, _ in tracks]
+    try:
+        result = await _users().bulk_write(
+            [
+                UpdateOne(
+                    {"user_id": user_id, "last_played_track.id": {"$ne": track["id"]}},
+                    _versioned({"$set": {"last_played_track": track}}),
+                )
+                for user_id, track in tracks
+            ],
+            ordered=False,
+        )
+    except BulkWriteError:
+        # The ops that did not fail were applied
+        await _notify_write(user_ids)
+        raise
+    if result.modified_count:
+        await _notify_write(user_ids)
+    return result
+
+
+async def touch_user_playlists(user_ids: List[str]) -> UpdateResult:
+    """Record that the users' profile playlists changed, bumping their version."""
+    result = await _users().update_many(
+        {"user_id": {"$in": user_ids}},
+        _versioned({"$set": {"playlists_updated_at": datetime.now(timezone.utc)}}),
+    )
+    await _notify_write(user_ids)
+    return result
+
+
+async def remove_user(user_id: str) -> DeleteResult:
+    result = await _users().delete_one({"user_id": user_id})
+    await _notify_write([user_id])
+    return result
+
+
+async def ensure_user_indexes():
+    # Token refresher sweeps select on an expires_at range
+    await _users().create_index("expires_at", name="expires_at")
+    # Only a plain index, with a warning, while duplicate user documents exist
+    await ensure_unique_index(_users(), "user_id", "user_id")
+
+
+async def set_user_tokens(user_id: str, tokens: dict, upsert: bool = False) -> UpdateResult:
+    """Store access/refresh tokens and expiry, plus any extra fields in ``tokens``.
+
+    Not versioned and not announced to write listeners: nothing users see changes.
+    """
+    return await _users().update_one(
+        {"user_id": user_id}, {"$set": tokens, "$unset": _TOKEN_FAILURE_FIELDS}, upsert=upsert
+    )
+
+
+async def find_user_tokens(user_id: str) -> Optional[UserTokens]:
+    """Load a user's tokens and mark them active for the background refresher.
+
+    Activity and token writes leave ``version`` alone; nothing users see changes.
+    """
+    return await _users().find_one_and_update(
+        {"user_id": user_id},
+        {"$set": {"last_active_at": datetime.now(timezone.utc)}},
+        projection={"_id": 0, "access_token": 1, "refresh_token": 1, "expires_at": 1},
+    )
+
+
+async def touch_user_activity(user_id: str) -> UpdateResult:
+    """Mark the user active for the background refresher, leaving ``version`` alone."""
+    return await _users().update_one(
+        {"user_id": user_id}, {"$set": {"last_active_at": datetime.now(timezone.utc)}}
+    )
+
+
+# Cleared by every successful token write
+_TOKEN_FAILURE_FIELDS = {"token_refresh_failed_at": "", "token_refresh_revoked": ""}
+
+
+async def find_users_with_expiring_tokens(
+    expires_before: int, active_since: datetime, failed_before: datetime
+) -> list:
+    """Active users whose tokens expire by ``expires_before``.
+
+    Skips revoked grants, and users whose last refresh failed after ``failed_before``.
+    """
+    return await _users().find(
+        {
+            "expires_at": {"$lte": expires_before},
+            "last_active_at": {"$gte": active_since},
+            "token_refresh_revoked": {"$ne": True},
+            "$or": [
+                {"token_refresh_failed_at": {"$exists": False}},
+                {"token_refresh_failed_at": {"$lt": failed_before}},
+            ],
+        },
+        {"_id": 0, "user_id": 1, "refresh_token": 1, "expires_at": 1},
+    ).to_list(length=None)
+
+
+async def bulk_update_tokens(refreshed: List[Tuple[str, int, dict]]) -> Optional[BulkWriteResult]:
+    """Write (user_id, previous_expires_at, token_info) tuples in one round trip.
+
+    Each write only applies if expires_at is still the value the caller read,
+    so a token refreshed concurrently elsewhere is never overwritten.
+    """
+    if not refreshed:
+        return None
+    return await _users().bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id, "expires_at": previous_expires_at},
+                {
+                    "$set": {
+                        "access_token": token_info["access_token"],
+                        "refresh_token": token_info["refresh_token"],
+                        "expires_at": token_info["expires_at"],
+                    },
+                    "$unset": _TOKEN_FAILURE_FIELDS,
+                },
+            )
+            for user_id, previous_expires_at, token_info in refreshed
+        ],
+        ordered=False,
+    )
+
+
+async def mark_token_refresh_failures(failures: List[Tuple[str, bool]]) -> Optional[BulkWriteResult]:
+    """Record failed refreshes from (user_id, revoked) so sweeps back off.
+
+    A revoked grant is not retried until the user logs in again.
+    """
+    if not failures:
+        return None
+    now = datetime.now(timezone.utc)
+    return await _users().bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id},
+                {"$set": {"token_refresh_failed_at": now, "token_refresh_revoked": revoked}},
+            )
+            for user_id, revoked in failures
+        ],
+        ordered=False,
+    )
\ No newline at end of file
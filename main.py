@@ -1,8 +1,12 @@
 # main.py
 from fastapi import FastAPI
+from core.errors import add_exception_handlers
+from core.lifespan import lifespan
 from core.middleware import add_cors_middleware
+from core.responses import FastJSONResponse
 from core.router import include_routers
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
 add_cors_middleware(app)
+add_exception_handlers(app)
 include_routers(app)
\ No newline at end of file
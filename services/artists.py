@@ -0,0 +1,120 @@
+# services/artists.py
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+from db.artists import ARTIST_GENRES_TTL, find_artist_genres, save_artist_genres
+from services import metrics
+from services.spotify_api import spotify_api
+
+# Spotify's several-artists endpoint accepts at most 50 IDs per call.
+ARTIST_BATCH_SIZE = 50
+ARTIST_CACHE_SIZE = int(os.getenv("ARTIST_CACHE_SIZE", "10000"))
+
+
+class ArtistGenreCache:
+    """Bounded in-process LRU in front of the artist_genres Mongo collection."""
+
+    def __init__(self, maxsize: int = ARTIST_CACHE_SIZE, ttl: int = ARTIST_GENRES_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+
+    def _get_local(self, artist_id: str):
+        entry = self._entries.get(artist_id)
+        if entry is None:
+            return None
+        stored_at, genres = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[artist_id]
+            return None
+        self._entries.move_to_end(artist_id)
+        return genres
+
+    def _put_local(self, genre_map: Dict[str, List[str]]):
+        now = time.monotonic()
+        for artist_id, genres in genre_map.items():
+            self._entries[artist_id] = (now, genres)
+            self._entries.move_to_end(artist_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, artist_ids: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """Return (found, missing), checking memory first and Mongo for the rest."""
+        found, missing = {}, []
+        for artist_id in artist_ids:
+            genres = self._get_local(artist_id)
+            if genres is None:
+                missing.append(artist_id)
+            else:
+                found[artist_id] = genres
+        metrics.incr("artist_genres.memory_hits", len(found))
+
+        if missing:
+            stored = await find_artist_genres(missing)
+            self._put_local(stored)
+            found.update(stored)
+            missing = [artist_id for artist_id in missing if artist_id not in stored]
+            metrics.incr("artist_genres.mongo_hits", len(stored))
+
+        metrics.incr("artist_genres.misses", len(missing))
+        return found, missing
+
+    async def put_many(self, genre_map: Dict[str, List[str]]):
+        self._put_local(genre_map)
+        await save_artist_genres(genre_map)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize}
+
+
+artist_genre_cache = ArtistGenreCache()
+
+
+def collect_artist_ids(tracks: Iterable[dict], primary_only: bool = False) -> List[str]:
+    """Return the unique artist IDs on the given tracks, in first-seen order."""
+    ids = []
+    for track in tracks:
+        artists = track.get("artists") or []
+        for artist in artists[:1] if primary_only else artists:
+            if artist.get("id"):
+                ids.append(artist["id"])
+    return list(dict.fromkeys(ids))
+
+
+async def fetch_artist_genres(access_token: str, artist_ids: List[str]) -> Dict[str, List[str]]:
+    chunks = [
+        artist_ids[i : i + ARTIST_BATCH_SIZE]
+        for i in range(0, len(artist_ids), ARTIST_BATCH_SIZE)
+    ]
+    pages = await asyncio.gather(*(spotify_api.artists(access_token, chunk) for chunk in chunks))
+
+    genre_map = {}
+    for page in pages:
+        for artist in page.get("artists", []):
+            # Unknown IDs come back as null entries
+            if artist:
+                genre_map[artist["id"]] = artist.get("genres", [])
+    return genre_map
+
+
+async def resolve_artist_genres(access_token: str, artist_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """Map each artist ID to its genres, going to Spotify only for cache misses."""
+    unique_ids = list(dict.fromkeys(i for i in artist_ids if i))
+    if not unique_ids:
+        return {}
+
+    genre_map, missing = await artist_genre_cache.get_many(unique_ids)
+    if missing:
+        fetched = await fetch_artist_genres(access_token, missing)
+        await artist_genre_cache.put_many(fetched)
+        genre_map.update(fetched)
+    return genre_map
+
+
+def get_artist_genres(artists: List[dict], genre_map: Dict[str, List[str]]) -> List[str]:
+    genres = []
+    for artist in artists:
+        genres.extend(genre_map.get(artist["id"], []))
+    return list(dict.fromkeys(genres))
\ No newline at end of file
@@ -0,0 +1,31 @@
+# services/metrics.py
+from collections import defaultdict
+
+# Process-local counters and timings, reported by /admin/metrics.
+_counters = defaultdict(int)
+_timings = {}
+
+
+def incr(name: str, value: int = 1):
+    _counters[name] += value
+
+
+def observe(name: str, value: float):
+    stats = _timings.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+    stats["count"] += 1
+    stats["total"] += value
+    stats["max"] = max(stats["max"], value)
+
+
+def snapshot() -> dict:
+    return {
+        "counters": dict(_counters),
+        "timings": {
+            name: {
+                "count": stats["count"],
+                "avg": round(stats["total"] / stats["count"], 3),
+                "max": round(stats["max"], 3),
+            }
+            for name, stats in _timings.items()
+        },
+    }
\ No newline at end of file
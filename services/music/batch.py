@@ -0,0 +1,108 @@
+# services/music/batch.py
+from itertools import chain
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from .taxonomy import TAXONOMY
+from .wizard import build_genre_analysis
+
+# Users per chunk; bounds the dense users x genres matrix held at once
+BATCH_CHUNK_SIZE = 1024
+
+
+def genre_counts_batch(
+    user_genres: Sequence[List[str]], limit: int = 20
+) -> List[Tuple[dict, dict]]:
+    """Return ``(genre_highest(g), genre_frequency(g, limit))`` for each list ``g``.
+
+    Genres are integer-encoded once, counted into a users x genres matrix and
+    rolled up to parent genres with a matrix product, instead of looping over
+    every genre of every user in Python. Ties break as in the per-user
+    functions: count descending, then first occurrence in the user's list.
+    """
+    results = []
+    for start in range(0, len(user_genres), BATCH_CHUNK_SIZE):
+        results.extend(_count_chunk(user_genres[start : start + BATCH_CHUNK_SIZE], limit))
+    return results
+
+
+def _count_chunk(user_genres: Sequence[List[str]], limit: int) -> List[Tuple[dict, dict]]:
+    n_users = len(user_genres)
+    lengths = np.fromiter((len(g) for g in user_genres), dtype=np.int64, count=n_users)
+    if not lengths.sum():
+        return [({}, {}) for _ in range(n_users)]
+
+    # Encode each distinct raw string once, then fold raw ids onto normalized genres
+    flat = list(chain.from_iterable(user_genres))
+    raw_index = {g: i for i, g in enumerate(dict.fromkeys(flat))}
+    raw_ids = np.fromiter(map(raw_index.__getitem__, flat), dtype=np.int64, count=len(flat))
+    genre_index = {}
+    raw_to_genre = np.fromiter(
+        (genre_index.setdefault(g.strip().lower(), len(genre_index)) for g in raw_index),
+        dtype=np.int64,
+        count=len(raw_index),
+    )
+    genre_ids = raw_to_genre[raw_ids]
+    vocab = list(genre_index)
+    n_genres = len(vocab)
+
+    user_ids = np.repeat(np.arange(n_users), lengths)
+    positions = np.arange(len(raw_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    # Sparse (user, genre) cells: count and first position within the user's list
+    cells, first_index, cell_counts = np.unique(
+        user_ids * n_genres + genre_ids, return_index=True, return_counts=True
+    )
+    cell_users, cell_genres = np.divmod(cells, n_genres)
+    cell_first = positions[first_index]
+
+    # float32 keeps the rollup on BLAS; per-user counts are far below 2**24
+    counts = np.zeros((n_users, n_genres), dtype=np.float32)
+    counts[cell_users, cell_genres] = cell_counts
+
+    # Parent rollup: genre -> parent one-hot, then one matrix product
+    genre_parents = [TAXONOMY.resolve(g) or "other" for g in vocab]
+    parent_index = {}
+    parent_ids = np.array([parent_index.setdefault(p, len(parent_index)) for p in genre_parents])
+    parent_names = list(parent_index)
+    rollup = np.zeros((n_genres, len(parent_names)), dtype=np.float32)
+    rollup[np.arange(n_genres), parent_ids] = 1
+    parent_counts = (counts @ rollup).astype(np.int64)
+
+    # Unseen parents sort after every seen one; their zero count drops them anyway
+    longest = int(lengths.max())
+    parent_first = np.full(parent_counts.shape, longest, dtype=np.int64)
+    np.minimum.at(parent_first, (cell_users, parent_ids[cell_genres]), cell_first)
+    parent_order = np.argsort(parent_first - parent_counts * (longest + 1), axis=1)
+
+    # genre_frequency ignores meta genres entirely; rank the remaining cells per user
+    is_meta = np.fromiter((g in TAXONOMY.meta_genres for g in vocab), dtype=bool, count=n_genres)
+    keep = ~is_meta[cell_genres]
+    sub_users, sub_genres = cell_users[keep], cell_genres[keep]
+    sub_counts, sub_first = cell_counts[keep], cell_first[keep]
+    order = np.lexsort((sub_first, -sub_counts, sub_users))
+    sub_genres, sub_counts = sub_genres[order], sub_counts[order]
+    bounds = np.searchsorted(sub_users[order], np.arange(n_users + 1))
+
+    # Plain Python lists make the per-user dict building cheap
+    parent_order, parent_counts = parent_order.tolist(), parent_counts.tolist()
+    sub_genres, sub_counts, bounds = sub_genres.tolist(), sub_counts.tolist(), bounds.tolist()
+    limit = max(limit, 0)
+
+    results = []
+    for u in range(n_users):
+        row = parent_counts[u]
+        highest = {parent_names[k]: row[k] for k in parent_order[u] if row[k]}
+        start, end = bounds[u], min(bounds[u + 1], bounds[u] + limit)
+        frequency = {vocab[g]: c for g, c in zip(sub_genres[start:end], sub_counts[start:end])}
+        results.append((highest, frequency))
+    return results
+
+
+def analyze_genres_batch(user_genres: Dict[str, List[str]], limit: int = 20) -> Dict[str, dict]:
+    """Build the stored genre analysis for many users in one pass."""
+    user_ids = list(user_genres)
+    counts = genre_counts_batch([user_genres[u] for u in user_ids], limit)
+    return {
+        user_id: build_genre_analysis(highest, frequency)
+        for user_id, (highest, frequency) in zip(user_ids, counts)
+    }
@@ -0,0 +1,164 @@
+# services/music/taxonomy.py
+import json
+import logging
+import os
+import pickle
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from .meta_gradients import gradients
+
+MUSIC_DIR = os.path.dirname(__file__)
+GENRE_MAP_PATH = os.path.join(MUSIC_DIR, "genre-map.json")
+META_GENRES_PATH = os.path.join(MUSIC_DIR, "meta-genres.json")
+TAXONOMY_ARTIFACT_PATH = os.getenv(
+    "GENRE_TAXONOMY_PATH", os.path.join(MUSIC_DIR, "taxonomy.pickle")
+)
+
+DEFAULT_GRADIENT = "linear-gradient(to right, #666, #999)"
+# Bump when the artifact layout changes so stale builds are ignored
+ARTIFACT_VERSION = 1
+# Bounded memo of fallback resolutions (hits and misses)
+RESOLVE_CACHE_SIZE = int(os.getenv("GENRE_RESOLVE_CACHE_SIZE", "4096"))
+# Marks a trie node that completes a mapped genre; tokens are never empty
+_TERMINAL = ""
+
+
+def normalize(genre: str) -> str:
+    return genre.strip().lower()
+
+
+class GenreTaxonomy:
+    """Genre -> parent -> gradient lookups, compiled once per process."""
+
+    __slots__ = ("parents", "gradients", "meta_genres", "_genre_gradients", "_suffix_trie", "resolve")
+
+    def __init__(self, parents: Dict[str, str], gradients: Dict[str, str], meta_genres: FrozenSet[str]):
+        self.parents = parents
+        self.gradients = gradients
+        self.meta_genres = meta_genres
+        self._genre_gradients = {
+            genre: gradients.get(parent, DEFAULT_GRADIENT) for genre, parent in parents.items()
+        }
+        self._suffix_trie = self._build_suffix_trie(parents)
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    @staticmethod
+    def _build_suffix_trie(parents: Dict[str, str]) -> dict:
+        """Index mapped genres by their words in reverse, so suffixes share paths."""
+        trie = {}
+        for genre, parent in parents.items():
+            node = trie
+            for token in reversed(genre.split()):
+                node = node.setdefault(token, {})
+            node[_TERMINAL] = parent
+        return trie
+
+    def _longest_suffix(self, tokens: List[str]) -> Optional[str]:
+        node, parent = self._suffix_trie, None
+        for token in reversed(tokens):
+            node = node.get(token)
+            if node is None:
+                break
+            parent = node.get(_TERMINAL, parent)
+        return parent
+
+    def _resolve(self, genre: str) -> Optional[str]:
+        genre_lc = normalize(genre)
+        parent = self.parents.get(genre_lc)
+        if parent is not None:
+            return parent
+
+        tokens = genre_lc.split()
+        # Longest mapped suffix first: "tokyo indie rock" -> "indie rock"
+        parent = self._longest_suffix(tokens)
+        if parent is not None:
+            return parent
+
+        # Otherwise the longest mapped run of words anywhere, e.g. "hip hop francais"
+        for size in range(len(tokens) - 1, 0, -1):
+            for start in range(len(tokens) - size + 1):
+                parent = self.parents.get(" ".join(tokens[start : start + size]))
+                if parent is not None:
+                    return parent
+        return None
+
+    @classmethod
+    def from_sources(cls) -> "GenreTaxonomy":
+        with open(GENRE_MAP_PATH) as f:
+            raw_map = json.load(f)
+
+        parents = {normalize(k): normalize(v) for k, v in raw_map.items()}
+        # Every parent genre maps to itself
+        for parent in set(parents.values()):
+            parents.setdefault(parent, parent)
+
+        meta_genres = frozenset()
+        if os.path.exists(META_GENRES_PATH):
+            with open(META_GENRES_PATH) as f:
+                meta_genres = frozenset(normalize(g) for g in json.load(f))
+
+        return cls(parents, {normalize(k): v for k, v in gradients.items()}, meta_genres)
+
+    def parent(self, genre: str) -> Optional[str]:
+        """Return the exactly mapped parent genre, or None when the genre is unmapped.
+
+        Use ``resolve`` to also fall back to suffix and word matches.
+        """
+        return self.parents.get(normalize(genre))
+
+    def lookup(self, genre: str) -> Tuple[Optional[str], str]:
+        genre_lc = normalize(genre)
+        return self.parents.get(genre_lc), self._genre_gradients.get(genre_lc, DEFAULT_GRADIENT)
+
+    def gradient(self, name: str) -> str:
+        return self.gradients.get(name.lower(), DEFAULT_GRADIENT)
+
+    def is_meta(self, genre: str) -> bool:
+        return genre.lower() in self.meta_genres
+
+    def dump(self, path: str = TAXONOMY_ARTIFACT_PATH):
+        payload = {
+            "version": ARTIFACT_VERSION,
+            "parents": self.parents,
+            "gradients": self.gradients,
+            "meta_genres": sorted(self.meta_genres),
+        }
+        with open(path, "wb") as f:
+            pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str = TAXONOMY_ARTIFACT_PATH) -> Optional["GenreTaxonomy"]:
+        """Load a prebuilt artifact, or None if it is missing or older than its sources."""
+        try:
+            built_at = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        sources = [GENRE_MAP_PATH, META_GENRES_PATH, os.path.join(MUSIC_DIR, "meta_gradients.py")]
+        if any(os.path.exists(src) and os.path.getmtime(src) > built_at for src in sources):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable genre taxonomy artifact {path}: {e}")
+            return None
+
+        if payload.get("version") != ARTIFACT_VERSION:
+            return None
+        return cls(payload["parents"], payload["gradients"], frozenset(payload["meta_genres"]))
+
+
+def load_taxonomy() -> GenreTaxonomy:
+    return GenreTaxonomy.load() or GenreTaxonomy.from_sources()
+
+
+TAXONOMY = load_taxonomy()
+
+
+if __name__ == "__main__":
+    # Build step: python -m services.music.taxonomy
+    taxonomy = GenreTaxonomy.from_sources()
+    taxonomy.dump()
+    print(f"✅ Wrote {len(taxonomy.parents)} genres to {TAXONOMY_ARTIFACT_PATH}")
@@ -1,23 +1,15 @@
-import os
-import json
 import logging
+import os
+import time
 from collections import defaultdict, Counter
-from .meta_gradients import gradients
+from .taxonomy import DEFAULT_GRADIENT, TAXONOMY
 
 logging.basicConfig(level=logging.INFO)
 
-# 🔁 Load genre-map.json
-genre_map_path = os.path.join(os.path.dirname(__file__), "genre-map.json")
-with open(genre_map_path) as f:
-    raw_map = json.load(f)
-
-# 🔁 Normalize keys and values
-GENRE_MAP = {k.strip().lower(): v.strip().lower() for k, v in raw_map.items()}
-
-# 🧠 Ensure all parent genres are mapped to themselves
-for parent in set(GENRE_MAP.values()):
-    if parent not in GENRE_MAP:
-        GENRE_MAP[parent] = parent
+# Kept as module attributes for existing importers; both come from the
+# compiled taxonomy so every caller sees the same normalized data.
+GENRE_MAP = TAXONOMY.parents
+META_GENRES = TAXONOMY.meta_genres
 
 
 def filter_sub_genres(genre_list):
@@ -25,29 +17,60 @@ def filter_sub_genres(genre_list):
     return [g for g in genre_list if g.lower() not in META_GENRES]
 
 
-# Optional: Load meta-genres.json for is_meta_genre()
-meta_genre_path = os.path.join(os.path.dirname(__file__), "meta-genres.json")
-if os.path.exists(meta_genre_path):
-    with open(meta_genre_path) as f:
-        META_GENRES = set(g.strip().lower() for g in json.load(f))
-else:
-    META_GENRES = set()
+class UnmappedGenreCounter:
+    """Approximate top-k counts of unmapped genres in fixed memory (Space-Saving).
+
+    Counts are logged and reset every ``flush_interval`` seconds instead of
+    logging each miss as it happens.
+    """
+
+    def __init__(self, capacity: int = 256, flush_interval: int = 300, report_size: int = 20):
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.report_size = report_size
+        self.counts = {}
+        self._last_flush = time.monotonic()
 
-UNCATEGORIZED_GENRES = defaultdict(int)
+    def add(self, genre: str):
+        if genre in self.counts:
+            self.counts[genre] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[genre] = 1
+        else:
+            # Replace the rarest entry and inherit its count as an upper bound
+            rarest = min(self.counts, key=self.counts.get)
+            self.counts[genre] = self.counts.pop(rarest) + 1
+
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.counts:
+            top = sorted(self.counts.items(), key=lambda x: -x[1])[: self.report_size]
+            logging.info(
+                "Unmapped genres since last flush: "
+                + ", ".join(f"'{g}' (x{c})" for g, c in top)
+            )
+        self.counts = {}
+        self._last_flush = time.monotonic()
+
+
+UNCATEGORIZED_GENRES = UnmappedGenreCounter(
+    capacity=int(os.getenv("UNMAPPED_GENRES_CAPACITY", "256")),
+    flush_interval=int(os.getenv("UNMAPPED_GENRES_FLUSH_INTERVAL", "300")),
+)
 
 
 def get_parent_genre(genre: str) -> str:
-    genre_lc = genre.strip().lower()
-    if genre_lc in GENRE_MAP:
-        return GENRE_MAP[genre_lc]
-    else:
-        UNCATEGORIZED_GENRES[genre_lc] += 1
-        logging.info(f"Unmapped genre: '{genre_lc}'")
+    parent = TAXONOMY.resolve(genre)
+    if parent is None:
+        UNCATEGORIZED_GENRES.add(genre.strip().lower())
         return "other"
+    return parent
 
 
 def is_meta_genre(name: str) -> bool:
-    return name.lower() in META_GENRES
+    return TAXONOMY.is_meta(name)
 
 
 def genre_frequency(genre_inputs, limit=20):
@@ -82,9 +105,9 @@ def genre_highest(genre_inputs):
             OTHER_GENRES[genre] += count
 
     if OTHER_GENRES:
-        logging.info("🚨 Genres categorized as 'other':")
+        logging.debug("🚨 Genres categorized as 'other':")
         for g, c in sorted(OTHER_GENRES.items(), key=lambda x: -x[1]):
-            logging.info(f"  '{g}' → other (x{c})")
+            logging.debug(f"  '{g}' → other (x{c})")
 
     return dict(sorted(result.items(), key=lambda item: item[1], reverse=True))
 
@@ -110,4 +133,48 @@ def generate_user_summary(highest_genres: dict, total: int = None):
     return f"🎧 You mostly listen to {primary} music ({primary_pct}%). {detail}"
 
 def get_gradient_for_genre(name: str) -> str:
-    return gradients.get(name.lower(), "linear-gradient(to right, #666, #999)")
\ No newline at end of file
+    return TAXONOMY.gradient(name)
+
+
+def build_genre_analysis(raw_highest: dict, sub_genres_raw: dict) -> dict:
+    """Turn genre_highest / genre_frequency counts into the stored analysis shape."""
+    total = sum(raw_highest.values()) or 1
+    meta_genres = {
+        genre: {
+            "portion": round((count / total) * 100, 1),
+            "gradient": get_gradient_for_genre(genre),
+        }
+        for genre, count in raw_highest.items()
+    }
+
+    sub_genres = {}
+    total_subgenre_count = sum(sub_genres_raw.values()) or 1
+    for genre, count in sub_genres_raw.items():
+        portion = round((count / total_subgenre_count) * 100, 1)
+        # genre_highest already counted the unmapped ones
+        parent = TAXONOMY.resolve(genre) or "other"
+        sub_genres[genre] = {
+            "portion": portion,
+            "parent_genre": parent,
+            "gradient": get_gradient_for_genre(parent),
+        }
+
+    sorted_subs = sorted(sub_genres.items(), key=lambda x: -x[1]["portion"])
+    top_sub = next(
+        (g for g, _ in sorted_subs if TAXONOMY.parent(g) != g.lower()),
+        sorted_subs[0][0] if sorted_subs else None,
+    )
+    top_meta = sub_genres[top_sub]["parent_genre"] if top_sub else None
+
+    result = {
+        "sub_genres": dict(sorted(sub_genres.items(), key=lambda x: -x[1]["portion"])[:10]),
+        "meta_genres": dict(sorted(meta_genres.items(), key=lambda x: -x[1]["portion"])[:10]),
+        "top_subgenre": {
+            "sub_genre": top_sub,
+            "parent_genre": top_meta,
+            # No sub-genres at all (no genres, or only meta genres)
+            "gradient": get_gradient_for_genre(top_meta) if top_meta else DEFAULT_GRADIENT,
+        },
+    }
+
+    return result
\ No newline at end of file
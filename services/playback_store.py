@@ -0,0 +1,151 @@
+# services/playback_store.py
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from pymongo.errors import BulkWriteError
+from db.users import bulk_set_last_played_tracks, find_last_played
+from services import metrics
+
+# How long a last_played_track write waits to be merged with later ones
+PLAYBACK_FLUSH_DELAY = float(os.getenv("PLAYBACK_FLUSH_DELAY", "2"))
+# Flush straight away once this many users have pending writes
+PLAYBACK_FLUSH_MAX_BATCH = int(os.getenv("PLAYBACK_FLUSH_MAX_BATCH", "500"))
+# Flushes a buffered write survives before it is dropped
+PLAYBACK_FLUSH_MAX_ATTEMPTS = int(os.getenv("PLAYBACK_FLUSH_MAX_ATTEMPTS", "3"))
+# Users whose last written track id this worker remembers, and for how long.
+# Another worker may write a newer track meanwhile, so entries expire.
+PLAYBACK_WRITTEN_SIZE = int(os.getenv("PLAYBACK_WRITTEN_SIZE", "10000"))
+PLAYBACK_WRITTEN_TTL = float(os.getenv("PLAYBACK_WRITTEN_TTL", "300"))
+
+# user_id -> newest track not yet written; later updates replace earlier ones.
+# The write itself is filtered in Mongo, so it never rewrites a stored track.
+_pending: Dict[str, dict] = {}
+# user_id -> (written at, track id) of the last track this worker flushed
+_written: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+# user_id -> failed flushes of the write pending for that user
+_attempts: Dict[str, int] = {}
+_flush_task: Optional[asyncio.Task] = None
+
+
+def record_last_played(user_id: str, track: dict) -> bool:
+    """Queue ``track`` as the user's last played.
+
+    False, and nothing queued, when it is the track already queued or, with
+    nothing queued, the one this worker last wrote for the user.
+    """
+    queued = _pending.get(user_id)
+    current = queued.get("id") if queued is not None else _last_written(user_id)
+    if current == track["id"]:
+        metrics.incr("playback_store.unchanged")
+        return False
+
+    if queued is not None:
+        metrics.incr("playback_store.coalesced")
+    _pending[user_id] = track
+    _attempts.pop(user_id, None)
+    _schedule_flush()
+    return True
+
+
+def _last_written(user_id: str) -> Optional[str]:
+    entry = _written.get(user_id)
+    if entry is None:
+        return None
+    written_at, track_id = entry
+    if time.monotonic() - written_at > PLAYBACK_WRITTEN_TTL:
+        del _written[user_id]
+        return None
+    return track_id
+
+
+def _remember_written(items):
+    now = time.monotonic()
+    for user_id, track in items:
+        _written[user_id] = (now, track["id"])
+        _written.move_to_end(user_id)
+    while len(_written) > PLAYBACK_WRITTEN_SIZE:
+        _written.popitem(last=False)
+
+
+async def get_last_played(user_id: str) -> Optional[dict]:
+    """The user's last played track, including a write still in this worker's buffer."""
+    track = _pending.get(user_id)
+    if track is not None:
+        return track
+    user = await find_last_played(user_id)
+    return (user or {}).get("last_played_track")
+
+
+def _schedule_flush(delay: Optional[float] = None):
+    global _flush_task
+    if delay is None:
+        full = len(_pending) >= PLAYBACK_FLUSH_MAX_BATCH
+        if _flush_task is not None and not full:
+            return
+        delay = 0 if full else PLAYBACK_FLUSH_DELAY
+    if _flush_task is not None:
+        _flush_task.cancel()
+    _flush_task = asyncio.create_task(_flush_after(delay))
+
+
+async def _flush_after(delay: float):
+    global _flush_task
+    await asyncio.sleep(delay)
+    _flush_task = None
+    await flush_playback_writes(retry=True)
+
+
+async def flush_playback_writes(retry: bool = False):
+    """Write every pending track now with one bulk_write."""
+    global _pending
+    batch, _pending = _pending, {}
+    if not batch:
+        return
+
+    items = list(batch.items())
+    try:
+        await bulk_set_last_played_tracks(items)
+        metrics.incr("playback_store.flushed", len(batch))
+    except BulkWriteError as e:
+        # The rest of the batch was applied; a write Mongo rejected would be
+        # rejected again, so it is dropped rather than requeued
+        failed = [items[err["index"]][0] for err in e.details.get("writeErrors", [])]
+        metrics.incr("playback_store.dropped", len(failed))
+        for user_id in failed:
+            _written.pop(user_id, None)
+        _remember_written(item for item in items if item[0] not in failed)
+        print(f"⚠️ Dropped last played tracks Mongo rejected for {failed}: {e.details.get('writeErrors')}")
+    except Exception as e:
+        metrics.incr("playback_store.flush_failures")
+        print(f"⚠️ Failed to flush {len(batch)} last played tracks: {e}")
+        for user_id, track in items:
+            if user_id in _pending:
+                # A newer track arrived meanwhile and replaces this one
+                continue
+            attempts = _attempts.get(user_id, 0) + 1
+            if attempts >= PLAYBACK_FLUSH_MAX_ATTEMPTS:
+                _attempts.pop(user_id, None)
+                metrics.incr("playback_store.dropped")
+                continue
+            _attempts[user_id] = attempts
+            _pending[user_id] = track
+        if retry and _pending:
+            # Back off even when the buffer is full, instead of spinning
+            _schedule_flush(PLAYBACK_FLUSH_DELAY * 2)
+        return
+
+    _remember_written(items)
+    for user_id, _ in items:
+        if user_id not in _pending:
+            _attempts.pop(user_id, None)
+
+
+async def close_playback_store():
+    """Shutdown hook: cancel the timer and flush what is buffered."""
+    global _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        _flush_task = None
+    await flush_playback_writes()
@@ -0,0 +1,138 @@
+# services/playback_stream.py
+import asyncio
+import os
+from typing import Dict, Optional, Set
+from services import metrics
+from services.playback_store import get_last_played, record_last_played
+from services.rate_limit import BACKGROUND, spotify_priority
+from services.spotify import build_track_data
+from services.spotify_api import spotify_api
+from services.token import get_token_by_user_id
+
+# While a track plays we wake shortly after it should end, but never sleep
+# longer than this so skips are noticed reasonably soon.
+PLAYBACK_POLL_MIN = float(os.getenv("PLAYBACK_POLL_MIN", "5"))
+PLAYBACK_POLL_MAX = float(os.getenv("PLAYBACK_POLL_MAX", "60"))
+# Paused or idle players back off from the first value towards the second
+PLAYBACK_IDLE_POLL = float(os.getenv("PLAYBACK_IDLE_POLL", "30"))
+PLAYBACK_IDLE_POLL_MAX = float(os.getenv("PLAYBACK_IDLE_POLL_MAX", "300"))
+# Slack after the predicted end so Spotify has switched tracks when we ask
+PLAYBACK_END_SLACK = 1.5
+
+
+class PlaybackPoller:
+    """One Spotify poller per user, fanning track changes out to every open stream."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.track: Optional[dict] = None
+        self.is_playing = False
+        self._idle_delay = PLAYBACK_IDLE_POLL
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=8)
+        self.subscribers.add(queue)
+        if self.track is not None:
+            queue.put_nowait(self._event())
+        if self._task is None:
+            # Polling is background work; requests the user makes come first
+            with spotify_priority(BACKGROUND):
+                self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> bool:
+        """Drop a stream; returns True once nobody is listening any more."""
+        self.subscribers.discard(queue)
+        if self.subscribers:
+            return False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        return True
+
+    def _event(self) -> dict:
+        return {"track": self.track, "is_playing": self.is_playing}
+
+    def _publish(self):
+        event = self._event()
+        for queue in self.subscribers:
+            if queue.full():
+                # A slow reader only needs the latest state
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _next_delay(self, playback: Optional[dict]) -> float:
+        if not playback or not playback.get("item") or not playback.get("is_playing"):
+            delay = self._idle_delay
+            self._idle_delay = min(self._idle_delay * 2, PLAYBACK_IDLE_POLL_MAX)
+            return delay
+
+        self._idle_delay = PLAYBACK_IDLE_POLL
+        duration = playback["item"].get("duration_ms") or 0
+        progress = playback.get("progress_ms") or 0
+        remaining = max(0, duration - progress) / 1000 + PLAYBACK_END_SLACK
+        return min(max(remaining, PLAYBACK_POLL_MIN), PLAYBACK_POLL_MAX)
+
+    async def _poll(self) -> Optional[dict]:
+        access_token = await get_token_by_user_id(self.user_id)
+        playback = await spotify_api.current_playback(access_token)
+        metrics.incr("playback_stream.polls")
+
+        is_playing = bool(playback and playback.get("is_playing"))
+        item = (playback or {}).get("item")
+        if item and item.get("id") != (self.track or {}).get("id"):
+            self.track = await build_track_data(item, access_token)
+            self.is_playing = is_playing
+            record_last_played(self.user_id, self.track)
+            metrics.incr("playback_stream.track_changes")
+            self._publish()
+        elif is_playing != self.is_playing:
+            self.is_playing = is_playing
+            self._publish()
+        return playback
+
+    async def _run(self):
+        if self.track is None:
+            try:
+                self.track = await get_last_played(self.user_id)
+            except Exception as e:
+                print(f"⚠️ Could not load last played track for {self.user_id}: {e}")
+            if self.track:
+                self._publish()
+
+        while True:
+            try:
+                playback = await self._poll()
+                delay = self._next_delay(playback)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("playback_stream.poll_failures")
+                print(f"⚠️ Playback poll failed for {self.user_id}: {e}")
+                delay = self._next_delay(None)
+            await asyncio.sleep(delay)
+
+
+_pollers: Dict[str, PlaybackPoller] = {}
+
+
+def subscribe_playback(user_id: str) -> asyncio.Queue:
+    poller = _pollers.get(user_id)
+    if poller is None:
+        poller = _pollers[user_id] = PlaybackPoller(user_id)
+    return poller.subscribe()
+
+
+def unsubscribe_playback(user_id: str, queue: asyncio.Queue):
+    poller = _pollers.get(user_id)
+    if poller is not None and poller.unsubscribe(queue):
+        del _pollers[user_id]
+
+
+def active_playback_streams() -> dict:
+    return {
+        "users": len(_pollers),
+        "connections": sum(len(p.subscribers) for p in _pollers.values()),
+    }
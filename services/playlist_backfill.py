@@ -0,0 +1,173 @@
+# services/playlist_backfill.py
+import asyncio
+import os
+import uuid
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
+from db.jobs import checkpoint_job, find_job, find_running_jobs, finish_job, start_job
+from db.locks import acquire_lease
+from db.profile_playlists import bulk_update_profile_playlists, list_profile_playlists_after
+from services import metrics
+from services.rate_limit import BACKGROUND, spotify_priority
+from services.spotify_api import spotify_api
+from services.token import get_token_by_user_id
+
+JOB_KIND = "playlist_metadata_backfill"
+# Playlists per page; each page is written with one bulk_write, then checkpointed
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "500"))
+BACKFILL_USER_CONCURRENCY = int(os.getenv("BACKFILL_USER_CONCURRENCY", "5"))
+BACKFILL_PLAYLIST_CONCURRENCY = int(os.getenv("BACKFILL_PLAYLIST_CONCURRENCY", "10"))
+# A worker that stops renewing its lease for this long is presumed dead
+BACKFILL_LEASE_TTL = int(os.getenv("BACKFILL_LEASE_TTL", "300"))
+
+PLAYLIST_METADATA_FIELDS = "name,images,tracks.total,external_urls"
+
+_WORKER_ID = uuid.uuid4().hex
+# job_id -> task running it in this process
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+async def _backfill_user(
+    user_id: str,
+    playlist_ids: List[str],
+    user_semaphore: asyncio.Semaphore,
+    playlist_semaphore: asyncio.Semaphore,
+) -> dict:
+    async with user_semaphore:
+        try:
+            access_token = await get_token_by_user_id(user_id)
+        except Exception as e:
+            print(f"⚠️ Backfill skipped {user_id}, no usable token: {e}")
+            return {"updates": [], "failed": len(playlist_ids)}
+
+        async def fetch(playlist_id: str):
+            async with playlist_semaphore:
+                try:
+                    playlist = await spotify_api.playlist(
+                        access_token, playlist_id, fields=PLAYLIST_METADATA_FIELDS
+                    )
+                except Exception as e:
+                    print(f"⚠️ Failed to update playlist {playlist_id}: {e}")
+                    return None
+            return (
+                user_id,
+                playlist_id,
+                {
+                    "name": playlist["name"],
+                    "image": playlist["images"][0]["url"] if playlist.get("images") else None,
+                    "tracks": playlist["tracks"]["total"],
+                    "external_url": playlist["external_urls"]["spotify"],
+                },
+            )
+
+        results = await asyncio.gather(*(fetch(pid) for pid in playlist_ids))
+
+    updates = [r for r in results if r]
+    return {"updates": updates, "failed": len(playlist_ids) - len(updates)}
+
+
+def _checkpoint_position(checkpoint) -> Optional[Tuple[str, str]]:
+    """(user_id, playlist_id) to continue after; older jobs checkpointed a user_id."""
+    if not checkpoint:
+        return None
+    if isinstance(checkpoint, str):
+        # Sorts after every playlist id, so the whole user counts as done
+        return checkpoint, "\uffff"
+    return tuple(checkpoint)
+
+
+async def _hold_lease(job_id: str) -> bool:
+    """Wait for the job's lease; False once the job is no longer running.
+
+    After a crash the dead worker's lease has to lapse before a restarted
+    process can pick the job up again.
+    """
+    while not await acquire_lease(f"job:{job_id}", _WORKER_ID, BACKFILL_LEASE_TTL):
+        job = await find_job(job_id)
+        if not job or job["status"] != "running":
+            return False
+        await asyncio.sleep(BACKFILL_LEASE_TTL / 4)
+    return True
+
+
+async def run_playlist_backfill(job_id: str):
+    """Refresh track counts and links on every stored playlist, resuming from the checkpoint."""
+    job = await find_job(job_id)
+    if not job or job["status"] != "running":
+        return
+
+    after = _checkpoint_position(job.get("checkpoint"))
+    user_semaphore = asyncio.Semaphore(BACKFILL_USER_CONCURRENCY)
+    playlist_semaphore = asyncio.Semaphore(BACKFILL_PLAYLIST_CONCURRENCY)
+
+    try:
+        while True:
+            # Renewed every page, so only one worker ever advances the checkpoint
+            if not await _hold_lease(job_id):
+                return
+
+            page = await list_profile_playlists_after(after, limit=BACKFILL_BATCH_SIZE)
+            if not page:
+                break
+
+            users = [
+                (user_id, [p["playlist_id"] for p in group])
+                for user_id, group in groupby(page, key=lambda p: p["user_id"])
+            ]
+            results = await asyncio.gather(
+                *(
+                    _backfill_user(user_id, playlist_ids, user_semaphore, playlist_semaphore)
+                    for user_id, playlist_ids in users
+                )
+            )
+            updates = [u for r in results for u in r["updates"]]
+            failed = sum(r["failed"] for r in results)
+            # A user continued from the previous page was counted there
+            new_users = len(users) - (1 if after and users[0][0] == after[0] else 0)
+
+            await bulk_update_profile_playlists(updates)
+            after = (page[-1]["user_id"], page[-1]["playlist_id"])
+            await checkpoint_job(
+                job_id,
+                list(after),
+                {"users_processed": new_users, "playlists_updated": len(updates), "playlists_failed": failed},
+            )
+            metrics.incr("playlist_backfill.playlists_updated", len(updates))
+            metrics.incr("playlist_backfill.playlists_failed", failed)
+
+        await finish_job(job_id, "completed")
+    except asyncio.CancelledError:
+        # Left "running" so the next startup resumes from the checkpoint
+        raise
+    except Exception as e:
+        print(f"⚠️ Playlist backfill {job_id} failed: {e}")
+        await finish_job(job_id, "failed", error=str(e))
+
+
+def _spawn(job_id: str):
+    if job_id not in _tasks:
+        # Backfills only spend quota interactive requests leave unused
+        with spotify_priority(BACKGROUND):
+            task = asyncio.create_task(run_playlist_backfill(job_id))
+        _tasks[job_id] = task
+        task.add_done_callback(lambda _: _tasks.pop(job_id, None))
+
+
+async def start_playlist_backfill() -> str:
+    """Start a backfill, or return the id of the one already running."""
+    job_id = await start_job(JOB_KIND)
+    _spawn(job_id)
+    return job_id
+
+
+async def resume_playlist_backfills():
+    for job in await find_running_jobs(JOB_KIND):
+        print(f"🔁 Resuming playlist backfill {job['_id']} after {job.get('checkpoint')}")
+        _spawn(str(job["_id"]))
+
+
+async def stop_playlist_backfills():
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
\ No newline at end of file
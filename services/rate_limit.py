@@ -0,0 +1,180 @@
+# services/rate_limit.py
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from services import metrics
+from services.redis_client import get_redis
+
+# App-wide Spotify quota, shared by every worker when Redis is configured
+SPOTIFY_RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", "10"))
+SPOTIFY_RATE_BURST = float(os.getenv("SPOTIFY_RATE_BURST", "30"))
+# Share of the bucket background work may not dip into
+SPOTIFY_INTERACTIVE_RESERVE = float(os.getenv("SPOTIFY_INTERACTIVE_RESERVE", "0.3"))
+# In-flight Spotify calls per access token, so one heavy user cannot starve the rest
+SPOTIFY_USER_CONCURRENCY = int(os.getenv("SPOTIFY_USER_CONCURRENCY", "4"))
+# Longest an interactive request waits for quota before giving up with a 429
+SPOTIFY_INTERACTIVE_MAX_WAIT = float(os.getenv("SPOTIFY_INTERACTIVE_MAX_WAIT", "10"))
+# Cooldown applied when Spotify sends a 429 without Retry-After
+SPOTIFY_DEFAULT_RETRY_AFTER = float(os.getenv("SPOTIFY_DEFAULT_RETRY_AFTER", "1"))
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+_priority: ContextVar[str] = ContextVar("spotify_priority", default=INTERACTIVE)
+
+_BUCKET_KEY = "sinatra:spotify:bucket"
+_COOLDOWN_KEY = "sinatra:spotify:cooldown"
+
+# Atomic refill-and-take. Returns seconds to wait, 0 when a token was taken.
+# Uses the Redis clock so workers on different hosts agree on time.
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local floor = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens - 1 >= floor then
+    tokens = tokens - 1
+else
+    wait = (floor + 1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class SpotifyRateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Spotify rate limit reached, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def spotify_priority(priority: str):
+    """Run Spotify calls made in this block (and tasks created in it) at ``priority``."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _LocalBucket:
+    """Per-process fallback with the same semantics as the Redis script."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+
+    def take(self, floor: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens - 1 >= floor:
+            self.tokens -= 1
+            return 0.0
+        return (floor + 1 - self.tokens) / self.rate
+
+    def cooldown_remaining(self) -> float:
+        return max(0.0, self.cooldown_until - time.monotonic())
+
+    def cool_down(self, seconds: float):
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+
+
+class SpotifyRateGovernor:
+    """Token bucket plus a global Retry-After cooldown around outbound Spotify calls.
+
+    Quota and cooldown live in Redis when REDIS_URL is set, so all gunicorn
+    workers share them; otherwise, or while Redis is unreachable, each process
+    limits itself. Per-user concurrency is always enforced per process.
+    """
+
+    def __init__(self, rate: float = SPOTIFY_RATE_LIMIT, burst: float = SPOTIFY_RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._local = _LocalBucket(rate, burst)
+        self._redis = get_redis()
+        self._take = self._redis.register_script(_TAKE_SCRIPT) if self._redis is not None else None
+        # access_token -> semaphore, dropped once no call holds it
+        self._user_slots = weakref.WeakValueDictionary()
+
+    def _floor(self) -> float:
+        if _priority.get() == BACKGROUND:
+            return self.burst * SPOTIFY_INTERACTIVE_RESERVE
+        return 0.0
+
+    async def _cooldown_remaining(self) -> float:
+        if self._redis is not None:
+            try:
+                ttl_ms = await self._redis.pttl(_COOLDOWN_KEY)
+                return max(0.0, ttl_ms / 1000)
+            except Exception:
+                metrics.incr("spotify_rate.redis_errors")
+        return self._local.cooldown_remaining()
+
+    async def _take_token(self, floor: float) -> float:
+        if self._take is not None:
+            try:
+                return float(await self._take(keys=[_BUCKET_KEY], args=[self.rate, self.burst, floor]))
+            except Exception:
+                metrics.incr("spotify_rate.redis_errors")
+        return self._local.take(floor)
+
+    async def cool_down(self, retry_after: Optional[float]):
+        """Pause every caller after Spotify answered 429."""
+        seconds = retry_after if retry_after is not None else SPOTIFY_DEFAULT_RETRY_AFTER
+        metrics.incr("spotify_rate.throttled")
+        self._local.cool_down(seconds)
+        if self._redis is not None:
+            try:
+                # Only ever extend a cooldown another worker already set
+                if await self._redis.pttl(_COOLDOWN_KEY) < seconds * 1000:
+                    await self._redis.set(_COOLDOWN_KEY, 1, px=max(1, int(seconds * 1000)))
+            except Exception:
+                metrics.incr("spotify_rate.redis_errors")
+
+    async def acquire(self):
+        """Wait for quota; interactive callers give up after SPOTIFY_INTERACTIVE_MAX_WAIT."""
+        interactive = _priority.get() == INTERACTIVE
+        floor = self._floor()
+        started = time.monotonic()
+        while True:
+            wait = await self._cooldown_remaining()
+            if not wait:
+                wait = await self._take_token(floor)
+                if not wait:
+                    break
+            waited = time.monotonic() - started
+            if interactive and waited + wait > SPOTIFY_INTERACTIVE_MAX_WAIT:
+                metrics.incr("spotify_rate.rejected")
+                raise SpotifyRateLimited(wait)
+            await asyncio.sleep(wait)
+        metrics.observe(f"spotify_rate.{_priority.get()}_wait_seconds", time.monotonic() - started)
+
+    @asynccontextmanager
+    async def slot(self, access_token: str):
+        """Hold one of the user's concurrency slots and one unit of app quota."""
+        semaphore = self._user_slots.get(access_token)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(SPOTIFY_USER_CONCURRENCY)
+            self._user_slots[access_token] = semaphore
+        async with semaphore:
+            await self.acquire()
+            yield
+
+
+spotify_governor = SpotifyRateGovernor()
@@ -0,0 +1,34 @@
+# services/redis_client.py
+import os
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import redis.asyncio
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_client = None
+
+
+def get_redis() -> Optional["redis.asyncio.Redis"]:
+    """Shared Redis client, or None when REDIS_URL is unset or the client cannot be built.
+
+    Connections are opened lazily, so callers still have to handle errors
+    from individual commands and fall back to in-process state.
+    """
+    global _client
+    if _client is None and REDIS_URL:
+        try:
+            import redis.asyncio as aioredis
+
+            _client = aioredis.from_url(REDIS_URL)
+        except Exception as e:
+            print(f"⚠️ Redis unavailable, falling back to in-process state: {e}")
+    return _client
+
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    _client = None
\ No newline at end of file
@@ -0,0 +1,196 @@
+# services/response_cache.py
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Tuple
+from fastapi import Request, Response
+from core.responses import dumps
+from db.users import on_user_write
+from services import metrics
+from services.redis_client import REDIS_URL, get_redis
+
+# Writes invalidate entries; the TTL only bounds how long an unused entry lingers
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+# Shared caches may keep the body but must revalidate, which the ETag makes cheap
+PUBLIC_CACHE_CONTROL = os.getenv("PUBLIC_CACHE_CONTROL", "public, no-cache")
+# Users whose write generation each process remembers without Redis
+RESPONSE_CACHE_GENERATIONS = int(os.getenv("RESPONSE_CACHE_GENERATIONS", "100000"))
+# Worker processes, as uvicorn and gunicorn read it. Without Redis a write only
+# invalidates its own worker's entries, so the cache is off when there are several.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def _cached(body: bytes) -> CachedResponse:
+    return CachedResponse(body, f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"')
+
+
+class ResponseCache:
+    """Serialized JSON responses keyed by (kind, user_id, generation).
+
+    Every user write bumps the user's generation, so later lookups miss and
+    rebuild; a build racing a write is stored under the old generation and
+    never served again. With Redis the generation and bodies are shared by
+    all workers. Without it each process keeps its own, which is only
+    correct for a single worker, so with more the cache builds every response.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        size: int = RESPONSE_CACHE_SIZE,
+        ttl: int = RESPONSE_CACHE_TTL,
+        generations: int = RESPONSE_CACHE_GENERATIONS,
+    ):
+        self.prefix = prefix
+        self.size = size
+        self.ttl = ttl
+        self.max_generations = generations
+        # key -> (expires_at, response), most recently used last
+        self._entries: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        # user_id -> value of _clock at the user's last write, least recently written first.
+        # Users not in it (never written, or evicted) are at _floor, the newest
+        # generation evicted, so an eviction can never bring back an older key.
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._clock = 0
+        self._floor = 0
+        # key -> build every concurrent miss for that key awaits
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return WEB_CONCURRENCY <= 1 or get_redis() is not None
+
+    async def _generation(self, user_id: str) -> str:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                return str(int(await redis.get(f"{self.prefix}:gen:{user_id}") or 0))
+            except Exception:
+                metrics.incr(f"{self.prefix}.redis_errors")
+        # Prefixed so a local generation never names an entry cached under Redis's
+        return f"local{self._generations.get(user_id, self._floor)}"
+
+    async def invalidate(self, user_ids: List[str]):
+        for user_id in user_ids:
+            self._clock += 1
+            self._generations[user_id] = self._clock
+            self._generations.move_to_end(user_id)
+        while len(self._generations) > self.max_generations:
+            _, evicted = self._generations.popitem(last=False)
+            self._floor = max(self._floor, evicted)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for user_id in user_ids:
+                        pipe.incr(f"{self.prefix}:gen:{user_id}")
+                    await pipe.execute()
+            except Exception:
+                metrics.incr(f"{self.prefix}.redis_errors")
+
+    def _remember(self, key: str, response: CachedResponse):
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    async def _build(self, key: str, builder: Callable[[], Awaitable]) -> CachedResponse:
+        response = _cached(dumps(await builder()))
+        self._remember(key, response)
+        redis = get_redis()
+        if redis is not None:
+            try:
+                await redis.set(f"{self.prefix}:body:{key}", response.body, ex=self.ttl)
+            except Exception:
+                metrics.incr(f"{self.prefix}.redis_errors")
+        return response
+
+    async def get_or_build(
+        self, kind: str, user_id: str, builder: Callable[[], Awaitable]
+    ) -> CachedResponse:
+        if not self.enabled:
+            self.bypassed += 1
+            metrics.incr(f"{self.prefix}.bypassed")
+            return _cached(dumps(await builder()))
+
+        key = f"{kind}:{user_id}:{await self._generation(user_id)}"
+
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.incr(f"{self.prefix}.memory_hits")
+            return entry[1]
+
+        redis = get_redis()
+        if redis is not None:
+            try:
+                body = await redis.get(f"{self.prefix}:body:{key}")
+            except Exception:
+                metrics.incr(f"{self.prefix}.redis_errors")
+                body = None
+            if body is not None:
+                response = _cached(body)
+                self._remember(key, response)
+                self.hits += 1
+                metrics.incr(f"{self.prefix}.redis_hits")
+                return response
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            metrics.incr(f"{self.prefix}.coalesced")
+        else:
+            self.misses += 1
+            metrics.incr(f"{self.prefix}.misses")
+            # One build per key, however many viewers arrive at once
+            task = asyncio.create_task(self._build(key, builder))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        served = self.hits + self.coalesced
+        lookups = served + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "generations": len(self._generations),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            # Share of lookups answered without building the response
+            "hit_rate": round(served / lookups, 3) if lookups else None,
+        }
+
+
+def cached_json_response(request: Request, cached: CachedResponse) -> Response:
+    """The cached body, or an empty 304 when the client already holds it."""
+    headers = {"ETag": cached.etag, "Cache-Control": PUBLIC_CACHE_CONTROL}
+    if cached.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+public_cache = ResponseCache("public_cache")
+
+if WEB_CONCURRENCY > 1 and not REDIS_URL:
+    print(f"⚠️ REDIS_URL not set with {WEB_CONCURRENCY} workers. Public response cache disabled.")
+
+
+@on_user_write
+async def _invalidate_public_cache(user_ids: List[str]):
+    await public_cache.invalidate(user_ids)
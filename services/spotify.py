@@ -1,45 +1,77 @@
 # services/spotify.py
-import spotipy
-from services.token import get_token
-from services.spotify_auth import get_artist_genres
-from services.token import get_token_by_user_id
+import asyncio
+import os
+from typing import List, Tuple
+from services.spotify_api import spotify_api
+from services.artists import get_artist_genres, resolve_artist_genres
+from services import metrics
+from db.playlists import find_synced_playlists_by_ids
 from datetime import datetime, timezone
 
+# Only what a stored playlist entry keeps, not the first 100 tracks
+PLAYLIST_ENRICH_FIELDS = "id,name,images,tracks.total,external_urls,snapshot_id"
+PLAYLIST_ENRICH_CONCURRENCY = int(os.getenv("PLAYLIST_ENRICH_CONCURRENCY", "8"))
+PLAYLIST_ENTRY_KEYS = ("id", "name", "image", "tracks", "external_url", "snapshot_id")
 
-def get_spotify_client(user_id: str) -> spotipy.Spotify:
-    access_token = get_token(user_id)
-    return spotipy.Spotify(auth=access_token)
 
-
-def enrich_playlist(sp: spotipy.Spotify, playlist_id: str) -> dict:
-    playlist = sp.playlist(playlist_id)
+async def enrich_playlist(access_token: str, playlist_id: str) -> dict:
+    playlist = await spotify_api.playlist(access_token, playlist_id, fields=PLAYLIST_ENRICH_FIELDS)
     return {
         "id": playlist["id"],
         "name": playlist["name"],
         "image": playlist["images"][0]["url"] if playlist["images"] else None,
         "tracks": playlist["tracks"]["total"],
         "external_url": playlist["external_urls"]["spotify"],
+        "snapshot_id": playlist.get("snapshot_id"),
     }
 
 
-def simplify_track_with_genres(sp: spotipy.Spotify, track: dict, genre_cache: dict) -> dict:
+async def enrich_playlists(
+    access_token: str, user_id: str, playlists: List[dict]
+) -> Tuple[List[dict], List[dict]]:
+    """Return ``(entries, failures)`` for the requested playlists, in request order.
+
+    A playlist whose ``snapshot_id`` matches the user's synced copy is served
+    from it; the rest are fetched concurrently.
+    """
+    synced = await find_synced_playlists_by_ids(user_id, [pl["id"] for pl in playlists])
+    known = {p["id"]: p for p in synced if p.get("snapshot_id")}
+    semaphore = asyncio.Semaphore(PLAYLIST_ENRICH_CONCURRENCY)
+
+    async def enrich_one(pl: dict):
+        stored = known.get(pl["id"])
+        if stored and stored["snapshot_id"] == pl.get("snapshot_id"):
+            metrics.incr("playlist_enrich.cache_hits")
+            return {key: stored.get(key) for key in PLAYLIST_ENTRY_KEYS}, None
+
+        metrics.incr("playlist_enrich.fetches")
+        async with semaphore:
+            try:
+                return await enrich_playlist(access_token, pl["id"]), None
+            except Exception as e:
+                return None, {"id": pl["id"], "error": str(e)}
+
+    results = await asyncio.gather(*(enrich_one(pl) for pl in playlists))
+    entries = [entry for entry, _ in results if entry]
+    failures = [failure for _, failure in results if failure]
+    return entries, failures
+
+
+def simplify_track_with_genres(track: dict, genre_map: dict) -> dict:
     return {
         "name": track["name"],
         "artists": [a["name"] for a in track["artists"]],
         "album": track["album"]["name"],
         "external_url": track["external_urls"]["spotify"],
         "isrc": track.get("external_ids", {}).get("isrc"),
-        "genres": get_artist_genres(sp, track["artists"], genre_cache),
+        "genres": get_artist_genres(track["artists"], genre_map),
     }
 
-def get_spotify_client(user_id: str) -> spotipy.Spotify:
-    access_token = get_token_by_user_id(user_id)
-    return spotipy.Spotify(auth=access_token)
-
-def build_track_data(track, sp):
+async def build_track_data(track, access_token, genre_map=None):
     artist = track["artists"][0]
-    artist_data = sp.artist(artist["id"])
-    genres = artist_data.get("genres", [])
+    if genre_map is None:
+        genre_map = await resolve_artist_genres(access_token, [artist["id"]])
+    genres = genre_map.get(artist["id"], [])
 
     return {
         "id": track["id"],
@@ -0,0 +1,244 @@
+# services/spotify_api.py
+import asyncio
+import os
+from typing import AsyncIterator, Optional
+import httpx
+from services.rate_limit import spotify_governor
+
+SPOTIFY_API_URL = os.getenv("SPOTIFY_API_URL", "https://api.spotify.com/v1")
+SPOTIFY_TIMEOUT = float(os.getenv("SPOTIFY_TIMEOUT", "10"))
+SPOTIFY_MAX_CONNECTIONS = int(os.getenv("SPOTIFY_MAX_CONNECTIONS", "100"))
+SPOTIFY_MAX_KEEPALIVE = int(os.getenv("SPOTIFY_MAX_KEEPALIVE", "20"))
+# Pages of one listing requested at once after the first
+SPOTIFY_PAGE_CONCURRENCY = int(os.getenv("SPOTIFY_PAGE_CONCURRENCY", "4"))
+# Times a rate-limited (429) request is retried once its Retry-After passes
+SPOTIFY_MAX_RETRIES = int(os.getenv("SPOTIFY_MAX_RETRIES", "3"))
+
+
+class SpotifyAPIError(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"Spotify API error {status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.retry_after = retry_after
+
+
+class SpotifyAPI:
+    """Async Spotify Web API client sharing one keep-alive connection pool.
+
+    The bearer token is passed on every call, so a single instance serves all
+    users. Method names mirror the spotipy calls they replace.
+    """
+
+    def __init__(self, base_url: str = SPOTIFY_API_URL, timeout: float = SPOTIFY_TIMEOUT):
+        self.base_url = base_url
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=SPOTIFY_MAX_CONNECTIONS,
+                    max_keepalive_connections=SPOTIFY_MAX_KEEPALIVE,
+                    keepalive_expiry=30,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+
+    async def get(
+        self,
+        path: str,
+        access_token: str,
+        params: Optional[dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[dict]:
+        async with spotify_governor.slot(access_token):
+            response = await self.client.get(
+                path,
+                params={k: v for k, v in (params or {}).items() if v is not None},
+                headers={"Authorization": f"Bearer {access_token}"},
+                timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+            )
+
+        if response.status_code >= 400:
+            try:
+                message = response.json().get("error", {}).get("message", response.text)
+            except ValueError:
+                message = response.text
+            retry_after = response.headers.get("Retry-After")
+            retry_after = float(retry_after) if retry_after else None
+            if response.status_code == 429:
+                await spotify_governor.cool_down(retry_after)
+            raise SpotifyAPIError(response.status_code, message, retry_after=retry_after)
+
+        if response.status_code == 204:
+            return None
+        if not response.content:
+            # Never let a truncated answer pass for an empty listing
+            raise SpotifyAPIError(502, f"Empty {response.status_code} response body")
+        return response.json()
+
+    async def get_with_retry(
+        self, path: str, access_token: str, params: Optional[dict] = None, **kwargs
+    ) -> Optional[dict]:
+        """``get``, retrying when rate limited.
+
+        The 429 puts the governor into its Retry-After cooldown, so the retry
+        waits that out before going back to Spotify.
+        """
+        for attempt in range(SPOTIFY_MAX_RETRIES + 1):
+            try:
+                return await self.get(path, access_token, params, **kwargs)
+            except SpotifyAPIError as e:
+                if e.status_code != 429 or attempt == SPOTIFY_MAX_RETRIES:
+                    raise
+
+    async def paginate(
+        self,
+        path: str,
+        access_token: str,
+        params: Optional[dict] = None,
+        page_size: int = 50,
+        max_items: Optional[int] = None,
+        concurrency: int = SPOTIFY_PAGE_CONCURRENCY,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        skip_failed_pages: bool = False,
+    ) -> AsyncIterator:
+        """Yield every item of an offset-paged listing, in order.
+
+        The first page carries ``total``, so the remaining pages are requested
+        together, at most ``concurrency`` at a time, and yielded as soon as
+        each next page in sequence arrives. Works for any listing shaped like
+        ``{"items": [...], "total": n}``: playlists, top items, playlist
+        tracks, saved tracks.
+
+        Pass a shared ``semaphore`` to bound requests across several listings
+        instead of per call. With ``skip_failed_pages`` a page after the first
+        that fails is logged and skipped, keeping what the others returned.
+        """
+        params = dict(params or {})
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(offset: int) -> dict:
+            async with semaphore:
+                page = await self.get_with_retry(
+                    path, access_token, {**params, "limit": page_size, "offset": offset}
+                )
+            return page or {}
+
+        first = await fetch(0)
+        items = first.get("items", [])
+        total = first.get("total", len(items))
+        if max_items is not None:
+            total = min(total, max_items)
+
+        for item in items[:total]:
+            yield item
+
+        # Pages run to ``total``, not to the first short page: Spotify leaves
+        # unavailable items out, so a page can come back short mid-listing
+        offsets = range(page_size, total, page_size)
+        tasks = [asyncio.create_task(fetch(offset)) for offset in offsets]
+        try:
+            for offset, task in zip(offsets, tasks):
+                try:
+                    page = await task
+                except Exception as e:
+                    if not skip_failed_pages:
+                        raise
+                    print(f"⚠️ Skipping a failed page of {path}: {e}")
+                    continue
+                for item in page.get("items", [])[: total - offset]:
+                    yield item
+        finally:
+            # The consumer may stop early; do not leave requests running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def current_user(self, access_token: str, **kwargs) -> dict:
+        return await self.get("/me", access_token, **kwargs)
+
+    async def current_user_playlists(
+        self, access_token: str, limit: int = 50, offset: int = 0, **kwargs
+    ) -> dict:
+        return await self.get(
+            "/me/playlists", access_token, {"limit": limit, "offset": offset}, **kwargs
+        )
+
+    async def playlist(
+        self, access_token: str, playlist_id: str, fields: Optional[str] = None, **kwargs
+    ) -> dict:
+        return await self.get(
+            f"/playlists/{playlist_id}",
+            access_token,
+            {"fields": fields, "additional_types": "track"},
+            **kwargs,
+        )
+
+    async def artist(self, access_token: str, artist_id: str, **kwargs) -> dict:
+        return await self.get(f"/artists/{artist_id}", access_token, **kwargs)
+
+    async def artists(self, access_token: str, artist_ids: list, **kwargs) -> dict:
+        """Fetch up to 50 artists in one call via the several-artists endpoint."""
+        if len(artist_ids) > 50:
+            raise ValueError("Spotify accepts at most 50 artist IDs per request")
+        return await self.get(
+            "/artists", access_token, {"ids": ",".join(artist_ids)}, **kwargs
+        )
+
+    async def current_user_top_artists(
+        self,
+        access_token: str,
+        limit: int = 20,
+        offset: int = 0,
+        time_range: str = "medium_term",
+        **kwargs,
+    ) -> dict:
+        return await self.get(
+            "/me/top/artists",
+            access_token,
+            {"limit": limit, "offset": offset, "time_range": time_range},
+            **kwargs,
+        )
+
+    async def current_user_top_tracks(
+        self,
+        access_token: str,
+        limit: int = 20,
+        offset: int = 0,
+        time_range: str = "medium_term",
+        **kwargs,
+    ) -> dict:
+        return await self.get(
+            "/me/top/tracks",
+            access_token,
+            {"limit": limit, "offset": offset, "time_range": time_range},
+            **kwargs,
+        )
+
+    async def current_playback(self, access_token: str, **kwargs) -> Optional[dict]:
+        """Return the playback state, or None when nothing is active (HTTP 204)."""
+        return await self.get(
+            "/me/player", access_token, {"additional_types": "track"}, **kwargs
+        )
+
+    async def current_user_recently_played(
+        self, access_token: str, limit: int = 50, **kwargs
+    ) -> dict:
+        return await self.get(
+            "/me/player/recently-played", access_token, {"limit": limit}, **kwargs
+        )
+
+
+spotify_api = SpotifyAPI()
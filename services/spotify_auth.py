@@ -1,6 +1,10 @@
 # services/spotify_auth.py
 import os
+import time
 from spotipy.oauth2 import SpotifyOAuth
+from services.spotify_api import spotify_api, SpotifyAPIError
+
+SPOTIFY_TOKEN_URL = os.getenv("SPOTIFY_TOKEN_URL", "https://accounts.spotify.com/api/token")
 
 def get_spotify_oauth(redirect_uri: str = None):
     return SpotifyOAuth(
@@ -13,12 +17,18 @@ def get_spotify_oauth(redirect_uri: str = None):
     )
 
 
-def get_artist_genres(sp, artists, cache):
-    genres = set()
-    for artist in artists:
-        artist_id = artist["id"]
-        if artist_id not in cache:
-            artist_info = sp.artist(artist_id)
-            cache[artist_id] = artist_info.get("genres", [])
-        genres.update(cache[artist_id])
-    return list(genres)
\ No newline at end of file
+async def refresh_access_token(refresh_token: str) -> dict:
+    """Exchange a refresh token on the shared HTTP pool instead of spotipy's blocking call."""
+    response = await spotify_api.client.post(
+        SPOTIFY_TOKEN_URL,
+        data={"grant_type": "refresh_token", "refresh_token": refresh_token},
+        auth=(os.getenv("SPOTIFY_CLIENT_ID") or "", os.getenv("SPOTIFY_CLIENT_SECRET") or ""),
+    )
+    if response.status_code >= 400:
+        raise SpotifyAPIError(response.status_code, response.text)
+
+    token_info = response.json()
+    # Spotify only returns a new refresh token when it rotates the old one
+    token_info.setdefault("refresh_token", refresh_token)
+    token_info["expires_at"] = int(time.time()) + token_info["expires_in"]
+    return token_info
\ No newline at end of file
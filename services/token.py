@@ -1,50 +1,88 @@
 # services/token.py
-from fastapi import HTTPException, Request, Depends
-from services.spotify_auth import get_spotify_oauth
-from db.mongo import users_collection
+import asyncio
+import os
+import time
+from typing import Dict, Set, Tuple
+from fastapi import HTTPException, Request
+from services.spotify_auth import refresh_access_token
+from db.users import find_user_tokens, set_user_tokens, touch_user_activity
 
-def get_token(request: Request) -> str:
+# Treat tokens as expired this many seconds early so callers never receive
+# one that lapses mid-request.
+TOKEN_EXPIRY_MARGIN = int(os.getenv("TOKEN_EXPIRY_MARGIN", "60"))
+# Cached token reads record the user as active at most this often, so the
+# background refresher keeps their token warm
+TOKEN_ACTIVITY_INTERVAL = int(os.getenv("TOKEN_ACTIVITY_INTERVAL", "600"))
+
+# user_id -> (access_token, expires_at)
+_token_cache: Dict[str, Tuple[str, int]] = {}
+# user_id -> the in-flight load/refresh every concurrent caller awaits
+_in_flight: Dict[str, asyncio.Task] = {}
+# user_id -> when this worker last recorded the user as active
+_last_activity: Dict[str, float] = {}
+# Keeps the fire-and-forget activity writes referenced until they finish
+_activity_writes: Set[asyncio.Task] = set()
+
+
+def _is_fresh(expires_at: int) -> bool:
+    return expires_at - TOKEN_EXPIRY_MARGIN > time.time()
+
+
+def cache_token(user_id: str, access_token: str, expires_at: int):
+    _token_cache[user_id] = (access_token, expires_at)
+
+
+def forget_token(user_id: str):
+    _token_cache.pop(user_id, None)
+    _last_activity.pop(user_id, None)
+
+
+async def _touch_activity(user_id: str):
+    try:
+        await touch_user_activity(user_id)
+    except Exception as e:
+        print(f"⚠️ Failed to record activity for {user_id}: {e}")
+
+
+def _record_activity(user_id: str):
+    now = time.monotonic()
+    last = _last_activity.get(user_id)
+    if last is not None and now - last < TOKEN_ACTIVITY_INTERVAL:
+        return
+    _last_activity[user_id] = now
+    task = asyncio.create_task(_touch_activity(user_id))
+    _activity_writes.add(task)
+    task.add_done_callback(_activity_writes.discard)
+
+
+async def get_token(request: Request) -> str:
     user_id = request.cookies.get("sinatra_user_id")
     if not user_id:
         raise HTTPException(status_code=401, detail="Missing sinatra_user_id cookie")
 
-    user = users_collection.find_one({"user_id": user_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found in database")
+    return await get_token_by_user_id(user_id)
 
-    token_info = {
-        "access_token": user.get("access_token"),
-        "refresh_token": user.get("refresh_token"),
-        "expires_at": user.get("expires_at"),
-    }
 
-    if not all(token_info.values()):
-        raise HTTPException(status_code=400, detail="User token info incomplete")
+async def get_token_by_user_id(user_id: str) -> str:
+    cached = _token_cache.get(user_id)
+    if cached and _is_fresh(cached[1]):
+        _record_activity(user_id)
+        return cached[0]
+
+    task = _in_flight.get(user_id)
+    if task is None:
+        task = asyncio.create_task(_load_token(user_id))
+        _in_flight[user_id] = task
+        task.add_done_callback(lambda _: _in_flight.pop(user_id, None))
 
-    sp_oauth = get_spotify_oauth()
-
-    if sp_oauth.is_token_expired(token_info):
-        refreshed = sp_oauth.refresh_access_token(user["refresh_token"])
-        users_collection.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "access_token": refreshed["access_token"],
-                    "refresh_token": refreshed["refresh_token"],
-                    "expires_at": refreshed["expires_at"],
-                }
-            },
-        )
-        return refreshed["access_token"]
-
-    return token_info["access_token"]
-
-def refresh_user_token(user_id: str) -> dict:
-    _ = get_token(user_id)
-    return {"status": "ok"}
-
-def get_token_by_user_id(user_id: str) -> str:
-    user = users_collection.find_one({"user_id": user_id})
+    # Shield so one caller disconnecting does not cancel the shared refresh
+    return await asyncio.shield(task)
+
+
+async def _load_token(user_id: str) -> str:
+    # find_user_tokens records the activity itself
+    _last_activity[user_id] = time.monotonic()
+    user = await find_user_tokens(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -55,22 +93,25 @@ def get_token_by_user_id(user_id: str) -> str:
     }
 
     if not all(token_info.values()):
-        raise HTTPException(status_code=400, detail="Token info incomplete")
-
-    sp_oauth = get_spotify_oauth()
-
-    if sp_oauth.is_token_expired(token_info):
-        refreshed = sp_oauth.refresh_access_token(user["refresh_token"])
-        users_collection.update_one(
-            {"user_id": user_id},
-            {
-                "$set": {
-                    "access_token": refreshed["access_token"],
-                    "refresh_token": refreshed["refresh_token"],
-                    "expires_at": refreshed["expires_at"],
-                }
-            },
-        )
-        return refreshed["access_token"]
-
-    return token_info["access_token"]
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="User token info incomplete")
+
+    if _is_fresh(token_info["expires_at"]):
+        cache_token(user_id, token_info["access_token"], token_info["expires_at"])
+        return token_info["access_token"]
+
+    refreshed = await refresh_access_token(token_info["refresh_token"])
+    await set_user_tokens(
+        user_id,
+        {
+            "access_token": refreshed["access_token"],
+            "refresh_token": refreshed["refresh_token"],
+            "expires_at": refreshed["expires_at"],
+        },
+    )
+    cache_token(user_id, refreshed["access_token"], refreshed["expires_at"])
+    return refreshed["access_token"]
+
+
+async def refresh_user_token(user_id: str) -> dict:
+    _ = await get_token_by_user_id(user_id)
+    return {"status": "ok"}
\ No newline at end of file
@@ -0,0 +1,111 @@
+# services/token_refresher.py
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from db.locks import acquire_lease
+from db.users import bulk_update_tokens, find_users_with_expiring_tokens, mark_token_refresh_failures
+from services import metrics
+from services.spotify_api import SpotifyAPIError
+from services.spotify_auth import refresh_access_token
+from services.token import cache_token
+
+TOKEN_REFRESHER_ENABLED = os.getenv("TOKEN_REFRESHER_ENABLED", "true").lower() == "true"
+# Seconds between sweeps
+TOKEN_REFRESH_INTERVAL = int(os.getenv("TOKEN_REFRESH_INTERVAL", "60"))
+# Refresh tokens expiring within this many minutes
+TOKEN_REFRESH_WINDOW_MINUTES = int(os.getenv("TOKEN_REFRESH_WINDOW_MINUTES", "10"))
+TOKEN_REFRESH_CONCURRENCY = int(os.getenv("TOKEN_REFRESH_CONCURRENCY", "5"))
+# Skip users who have not requested a token for this many days
+TOKEN_REFRESH_INACTIVE_DAYS = int(os.getenv("TOKEN_REFRESH_INACTIVE_DAYS", "7"))
+# Minutes before a user whose refresh failed is tried again
+TOKEN_REFRESH_FAILURE_BACKOFF_MINUTES = int(os.getenv("TOKEN_REFRESH_FAILURE_BACKOFF_MINUTES", "60"))
+
+_WORKER_ID = uuid.uuid4().hex
+_task: Optional[asyncio.Task] = None
+
+
+async def refresh_expiring_tokens(
+    window_minutes: int = TOKEN_REFRESH_WINDOW_MINUTES,
+    concurrency: int = TOKEN_REFRESH_CONCURRENCY,
+    inactive_days: int = TOKEN_REFRESH_INACTIVE_DAYS,
+) -> dict:
+    """Refresh every recently active user's token that expires inside the window."""
+    window = window_minutes * 60
+    users = await find_users_with_expiring_tokens(
+        expires_before=int(time.time()) + window,
+        active_since=datetime.now(timezone.utc) - timedelta(days=inactive_days),
+        failed_before=datetime.now(timezone.utc) - timedelta(minutes=TOKEN_REFRESH_FAILURE_BACKOFF_MINUTES),
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = []
+
+    async def refresh_one(user: dict):
+        async with semaphore:
+            try:
+                token_info = await refresh_access_token(user["refresh_token"])
+            except Exception as e:
+                metrics.incr("token_refresher.failures")
+                print(f"⚠️ Proactive token refresh failed for {user['user_id']}: {e}")
+                # Spotify answers 400 invalid_grant once the user revoked access
+                revoked = (
+                    isinstance(e, SpotifyAPIError)
+                    and e.status_code == 400
+                    and "invalid_grant" in e.message
+                )
+                failures.append((user["user_id"], revoked))
+                return None
+
+        # How long the token sat inside the window before we got to it
+        metrics.observe(
+            "token_refresher.lag_seconds",
+            max(0.0, time.time() - (user["expires_at"] - window)),
+        )
+        return user["user_id"], user["expires_at"], token_info
+
+    results = await asyncio.gather(*(refresh_one(user) for user in users if user.get("refresh_token")))
+    refreshed = [r for r in results if r]
+
+    await bulk_update_tokens(refreshed)
+    await mark_token_refresh_failures(failures)
+    for user_id, _, token_info in refreshed:
+        cache_token(user_id, token_info["access_token"], token_info["expires_at"])
+
+    metrics.incr("token_refresher.refreshed", len(refreshed))
+    return {"candidates": len(users), "refreshed": len(refreshed), "failed": len(failures)}
+
+
+async def _run():
+    while True:
+        try:
+            # Only one worker sweeps per interval; the rest skip
+            if await acquire_lease("token_refresher", _WORKER_ID, TOKEN_REFRESH_INTERVAL * 2):
+                started = time.perf_counter()
+                await refresh_expiring_tokens()
+                metrics.observe("token_refresher.sweep_seconds", time.perf_counter() - started)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.incr("token_refresher.sweep_failures")
+            print(f"⚠️ Token refresher sweep failed: {e}")
+        await asyncio.sleep(TOKEN_REFRESH_INTERVAL)
+
+
+def start_token_refresher():
+    global _task
+    if TOKEN_REFRESHER_ENABLED and _task is None:
+        _task = asyncio.create_task(_run())
+
+
+async def stop_token_refresher():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None
\ No newline at end of file
@@ -0,0 +1,55 @@
+# tests/conftest.py
+import os
+import uuid
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+import db.mongo as mongo
+
+# A throwaway database is created on this server per test and dropped after
+TEST_MONGODB_URI = os.getenv("TEST_MONGODB_URI")
+
+
+class CommandRecorder(monitoring.CommandListener):
+    """Collects the commands the app sends while ``recording`` is on."""
+
+    def __init__(self):
+        self.recording = False
+        self.commands = []
+
+    def started(self, event):
+        if self.recording:
+            self.commands.append((event.command_name, dict(event.command)))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+@pytest.fixture
+async def mongo_db():
+    """The app's db.mongo bound to a fresh database, plus a CommandRecorder."""
+    if not TEST_MONGODB_URI:
+        pytest.skip("TEST_MONGODB_URI is not set")
+
+    recorder = CommandRecorder()
+    client = AsyncIOMotorClient(
+        TEST_MONGODB_URI, event_listeners=[recorder], serverSelectionTimeoutMS=3000
+    )
+    try:
+        await client.admin.command("ping")
+    except PyMongoError as e:
+        client.close()
+        pytest.skip(f"MongoDB at TEST_MONGODB_URI is unreachable: {e}")
+
+    name = f"sinatra_test_{uuid.uuid4().hex[:12]}"
+    mongo.client, mongo.db = client, client[name]
+    try:
+        yield mongo.db, recorder
+    finally:
+        await client.drop_database(name)
+        client.close()
+        mongo.client = mongo.db = None
\ No newline at end of file
@@ -0,0 +1,66 @@
+# tests/test_genre_batch.py
+import random
+import time
+from services.music.batch import analyze_genres_batch, genre_counts_batch
+from services.music.taxonomy import DEFAULT_GRADIENT, TAXONOMY
+from services.music.wizard import build_genre_analysis, genre_frequency, genre_highest
+
+
+def user_genres(users: int, seed: int = 0) -> list:
+    """Genre lists shaped like a top-artists fetch: mapped, meta and unmapped, mixed case."""
+    rng = random.Random(seed)
+    vocab = sorted(TAXONOMY.parents)[:400] + sorted(TAXONOMY.meta_genres) + [
+        f"unmapped genre {i}" for i in range(50)
+    ]
+    lists = []
+    for _ in range(users):
+        genres = [rng.choice(vocab) for _ in range(rng.randint(0, 300))]
+        lists.append([g.upper() if rng.random() < 0.1 else f" {g} " if rng.random() < 0.1 else g for g in genres])
+    return lists
+
+
+def test_batch_matches_per_user_functions():
+    lists = user_genres(300)
+    for genres, (highest, frequency) in zip(lists, genre_counts_batch(lists)):
+        # Order matters too: the stored analysis keeps the first ten of each
+        assert list(highest.items()) == list(genre_highest(genres).items())
+        assert list(frequency.items()) == list(genre_frequency(genres).items())
+
+
+def test_batch_analysis_matches_per_user_analysis():
+    lists = user_genres(50, seed=1)
+    batch = analyze_genres_batch({str(i): genres for i, genres in enumerate(lists)})
+    for i, genres in enumerate(lists):
+        expected = build_genre_analysis(genre_highest(genres), genre_frequency(genres))
+        assert batch[str(i)] == expected
+
+
+def test_users_without_sub_genres():
+    meta = sorted(TAXONOMY.meta_genres)[0]
+    result = analyze_genres_batch({"meta_only": [meta], "empty": []})
+
+    for user_id in ("meta_only", "empty"):
+        assert result[user_id]["sub_genres"] == {}
+        assert result[user_id]["top_subgenre"] == {
+            "sub_genre": None,
+            "parent_genre": None,
+            "gradient": DEFAULT_GRADIENT,
+        }
+    assert list(result["meta_only"]["meta_genres"]) == [meta]
+
+
+def test_batch_benchmark():
+    """Users/sec for the batch engine against looping the per-user functions."""
+    lists = user_genres(5000, seed=2)
+
+    started = time.perf_counter()
+    for genres in lists:
+        genre_highest(genres), genre_frequency(genres)
+    loop = time.perf_counter() - started
+
+    started = time.perf_counter()
+    genre_counts_batch(lists)
+    batch = time.perf_counter() - started
+
+    print(f"\n5000 users: per-user {len(lists) / loop:,.0f} users/s, batch {len(lists) / batch:,.0f} users/s")
+    assert batch < loop
\ No newline at end of file
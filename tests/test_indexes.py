@@ -0,0 +1,197 @@
+# tests/test_indexes.py
+"""Every query the repository modules send must be served by an index.
+
+The test runs each repository function against a seeded database, records
+the commands they send, and checks the winning plan of each one with
+explain(). Needs TEST_MONGODB_URI; skipped otherwise.
+"""
+from datetime import datetime, timedelta, timezone
+from db import artists, jobs, locks, playlists, profile_playlists, users
+
+# Enough documents that an index-backed sort beats a collection scan plus sort
+SEED_USERS = 300
+SEED_PLAYLISTS = 300
+
+_EXPLAINABLE = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+# Session and write-concern fields explain does not accept
+_DROP_FIELDS = {"lsid", "$db", "$clusterTime", "txnNumber", "writeConcern", "$readPreference", "ordered"}
+
+
+def _winning_stages(node, in_winning=False):
+    if isinstance(node, dict):
+        if in_winning and "stage" in node:
+            yield node["stage"]
+        for key, value in node.items():
+            if key == "rejectedPlans":
+                continue
+            yield from _winning_stages(value, in_winning or key == "winningPlan")
+    elif isinstance(node, list):
+        for value in node:
+            yield from _winning_stages(value, in_winning)
+
+
+def _uses_index(stage: str) -> bool:
+    return "IXSCAN" in stage or stage.startswith("EXPRESS") or stage in (
+        "IDHACK",
+        "COUNT_SCAN",
+        "DISTINCT_SCAN",
+    )
+
+
+def _explain_commands(name: str, command: dict):
+    """One explainable command per statement; bulk writes carry several."""
+    command = {k: v for k, v in command.items() if k not in _DROP_FIELDS}
+    if name == "update":
+        for statement in command.pop("updates"):
+            yield {**command, "updates": [statement]}
+    elif name == "delete":
+        for statement in command.pop("deletes"):
+            yield {**command, "deletes": [statement]}
+    else:
+        yield command
+
+
+async def _seed(db):
+    now = datetime.now(timezone.utc)
+    await db.users.insert_many(
+        [
+            {
+                "user_id": f"u{i:04}",
+                "display_name": f"User {i}",
+                "email": f"u{i}@example.com",
+                "access_token": "a",
+                "refresh_token": "r",
+                "expires_at": 1_000 + i,
+                "last_active_at": now,
+                "genre_analysis": {"highest": []},
+                "genre_last_updated": now,
+                "last_played_track": {"id": "t0"},
+                "version": 0,
+            }
+            for i in range(SEED_USERS)
+        ]
+    )
+    await db.synced_playlists.insert_many(
+        [
+            {
+                "user_id": "u0001",
+                "playlist_id": f"p{i:04}",
+                "name": f"Mix {i}",
+                "name_lower": f"mix {i}",
+                "tracks": i % 40,
+                "snapshot_id": "s",
+                "updated_at": now,
+            }
+            for i in range(SEED_PLAYLISTS)
+        ]
+    )
+    await db.profile_playlists.insert_many(
+        [
+            {
+                "user_id": f"u{i % 3:04}",
+                "playlist_id": f"p{i:04}",
+                "name": f"Mix {i}",
+                "tracks": i,
+                "added_at": now + timedelta(milliseconds=i),
+                "featured_rank": i if i < 3 else None,
+            }
+            for i in range(SEED_PLAYLISTS)
+        ]
+    )
+
+
+async def _exercise_repositories():
+    now = datetime.now(timezone.utc)
+
+    await users.find_user_profile("u0001")
+    await users.find_genre_analysis("u0001")
+    await users.find_last_played("u0001")
+    await users.page_user_summaries(None, 10)
+    await users.page_user_summaries("u0100", 10)
+    async for _ in users.iter_user_summaries(None, batch_size=100):
+        pass
+    await users.update_user("u0001", {"$set": {"theme": "dark"}})
+    await users.bulk_set_last_played_tracks([("u0001", {"id": "t1"}), ("u0002", {"id": "t2"})])
+    await users.touch_user_playlists(["u0001"])
+    await users.set_user_tokens("u0001", {"access_token": "b"})
+    await users.find_user_tokens("u0001")
+    await users.find_users_with_expiring_tokens(1_100, now - timedelta(days=1), now - timedelta(hours=1))
+    await users.mark_token_refresh_failures([("u0004", False), ("u0005", True)])
+    await users.bulk_update_tokens(
+        [("u0003", 1_003, {"access_token": "c", "refresh_token": "r", "expires_at": 9_999})]
+    )
+
+    await playlists.find_synced_playlists("u0001")
+    await playlists.find_synced_playlists_by_ids("u0001", ["p0001", "p0002"])
+    await playlists.find_synced_snapshots("u0001")
+    for sort in playlists.SYNCED_SORTS:
+        _, cursor = await playlists.page_synced_playlists("u0001", sort, None, 20)
+        await playlists.page_synced_playlists("u0001", sort, cursor, 20)
+        await playlists.page_synced_playlists("u0001", sort, None, 20, name_prefix="mix 1")
+    await playlists.count_synced_playlists("u0001")
+    await playlists.count_synced_playlists("u0001", name_prefix="mix 1")
+    await playlists.apply_synced_playlist_changes(
+        "u0001", [{"id": "new", "name": "New", "tracks": 5}], [], ["p0003"]
+    )
+
+    await profile_playlists.find_profile_playlists("u0001")
+    _, cursor = await profile_playlists.page_profile_playlists("u0001", None, 20)
+    await profile_playlists.page_profile_playlists("u0001", cursor, 20)
+    await profile_playlists.count_profile_playlists("u0001")
+    await profile_playlists.add_profile_playlists("u0001", [{"id": "added", "name": "Added"}])
+    await profile_playlists.set_featured_playlists("u0001", ["p0001", "added"])
+    await profile_playlists.remove_profile_playlists("u0001", ["added"])
+    await profile_playlists.replace_profile_playlists("u0002", [{"id": "p0002", "name": "Mix 2"}], ["p0002"])
+    page = await profile_playlists.list_profile_playlists_after(None, 50)
+    await profile_playlists.list_profile_playlists_after(
+        (page[-1]["user_id"], page[-1]["playlist_id"]), 50
+    )
+    await profile_playlists.bulk_update_profile_playlists([("u0001", "p0001", {"tracks": 1})])
+    await profile_playlists.find_dashboard("u0001")
+    await profile_playlists.find_public_profile("u0001")
+
+    await artists.save_artist_genres({"a1": ["pop"]})
+    await artists.find_artist_genres(["a1", "a2"])
+
+    job_id = await jobs.create_job("index_test")
+    await jobs.find_job(job_id)
+    await jobs.find_running_jobs("index_test")
+    await jobs.checkpoint_job(job_id, "u0001", {"done": 1})
+    await jobs.finish_job(job_id, "completed")
+    started = await jobs.start_job("index_test")
+    assert await jobs.start_job("index_test") == started
+    await locks.acquire_lease("index_test", "me", 60)
+
+    await profile_playlists.remove_all_profile_playlists("u0002")
+    await playlists.remove_synced_playlists("u0002")
+    await users.remove_user("u0299")
+
+
+async def test_repository_queries_use_indexes(mongo_db):
+    db, recorder = mongo_db
+    for ensure_indexes in (
+        users.ensure_user_indexes,
+        playlists.ensure_playlist_indexes,
+        profile_playlists.ensure_profile_playlist_indexes,
+        artists.ensure_artist_genre_indexes,
+        jobs.ensure_job_indexes,
+    ):
+        await ensure_indexes()
+    await _seed(db)
+
+    recorder.recording = True
+    await _exercise_repositories()
+    recorder.recording = False
+
+    recorded = [(name, cmd) for name, cmd in recorder.commands if name in _EXPLAINABLE]
+    assert recorded, "no repository queries were recorded"
+
+    unindexed = []
+    for name, command in recorded:
+        for explainable in _explain_commands(name, command):
+            plan = await db.command({"explain": explainable, "verbosity": "queryPlanner"})
+            stages = list(_winning_stages(plan))
+            if "COLLSCAN" in stages or not any(_uses_index(stage) for stage in stages):
+                unindexed.append((explainable, stages))
+
+    assert not unindexed, "\n".join(f"{cmd} -> {stages}" for cmd, stages in unindexed)
\ No newline at end of file
@@ -0,0 +1,88 @@
+# tests/test_mongo_concurrency.py
+"""Concurrent /me lookups on Motor against the blocking pymongo handler it replaced.
+
+Needs TEST_MONGODB_URI; skipped otherwise.
+"""
+import asyncio
+import time
+import anyio.to_thread
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from pymongo import MongoClient
+from api import user as user_routes
+from tests.conftest import TEST_MONGODB_URI
+
+USERS = 200
+REQUESTS = 2000
+
+
+def blocking_app(users_collection) -> FastAPI:
+    """/me as it was: a sync handler on the blocking client, run in the threadpool."""
+    app = FastAPI()
+
+    @app.get("/me")
+    def get_me(request: Request):
+        user = users_collection.find_one({"user_id": request.cookies.get("sinatra_user_id")})
+        if not user:
+            raise HTTPException(status_code=404)
+        return {"user_id": user["user_id"], "display_name": user["display_name"]}
+
+    return app
+
+
+def motor_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(user_routes.router)
+    return app
+
+
+async def _load(app: FastAPI) -> tuple:
+    """(requests/sec, most threadpool slots held at once) for REQUESTS concurrent calls."""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    peak, done = 0, asyncio.Event()
+
+    async def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, limiter.borrowed_tokens)
+            await asyncio.sleep(0)
+
+    sampler = asyncio.create_task(sample())
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(
+            *(
+                client.get("/me", cookies={"sinatra_user_id": f"u{i % USERS:04}"})
+                for i in range(REQUESTS)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    assert {r.status_code for r in responses} == {200}
+    assert {r.json()["display_name"] for r in responses} == {f"User {i}" for i in range(USERS)}
+    return REQUESTS / elapsed, peak
+
+
+async def test_motor_handlers_hold_no_threadpool_slots(mongo_db):
+    db, _ = mongo_db
+    await db.users.insert_many(
+        [{"user_id": f"u{i:04}", "display_name": f"User {i}", "theme": "default"} for i in range(USERS)]
+    )
+    await db.users.create_index("user_id", name="user_id")
+
+    sync_client = MongoClient(TEST_MONGODB_URI)
+    try:
+        blocking_rate, blocking_peak = await _load(blocking_app(sync_client[db.name].users))
+    finally:
+        sync_client.close()
+    motor_rate, motor_peak = await _load(motor_app())
+
+    print(
+        f"\n{REQUESTS} concurrent /me: blocking {blocking_rate:,.0f} req/s holding up to "
+        f"{blocking_peak} threadpool slots, Motor {motor_rate:,.0f} req/s holding {motor_peak}"
+    )
+    # The blocking handler queues behind the threadpool; Motor leaves it free
+    assert blocking_peak > 0
+    assert motor_peak == 0
\ No newline at end of file
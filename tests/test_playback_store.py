@@ -0,0 +1,51 @@
+# tests/test_playback_store.py
+from collections import OrderedDict
+import pytest
+from services import playback_store
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    """Fresh store state; returns the batches handed to Mongo."""
+    batches = []
+
+    async def bulk_set(tracks):
+        batches.append(list(tracks))
+
+    monkeypatch.setattr(playback_store, "bulk_set_last_played_tracks", bulk_set)
+    monkeypatch.setattr(playback_store, "_pending", {})
+    monkeypatch.setattr(playback_store, "_attempts", {})
+    monkeypatch.setattr(playback_store, "_written", OrderedDict())
+    monkeypatch.setattr(playback_store, "_flush_task", None)
+    yield batches
+    if playback_store._flush_task is not None:
+        playback_store._flush_task.cancel()
+
+
+async def test_same_track_after_flush_is_unchanged(writes):
+    track = {"id": "t1", "name": "Track"}
+
+    assert playback_store.record_last_played("u1", track)
+    await playback_store.flush_playback_writes()
+    assert not playback_store.record_last_played("u1", dict(track))
+    await playback_store.flush_playback_writes()
+
+    assert writes == [[("u1", track)]]
+
+
+async def test_new_track_after_flush_is_written(writes):
+    assert playback_store.record_last_played("u1", {"id": "t1"})
+    await playback_store.flush_playback_writes()
+    assert playback_store.record_last_played("u1", {"id": "t2"})
+    # Back to the written track while another is queued: it must replace it
+    assert playback_store.record_last_played("u1", {"id": "t1"})
+    await playback_store.flush_playback_writes()
+
+    assert writes == [[("u1", {"id": "t1"})], [("u1", {"id": "t1"})]]
+
+
+async def test_written_tracks_expire(writes, monkeypatch):
+    monkeypatch.setattr(playback_store, "PLAYBACK_WRITTEN_TTL", 0)
+    assert playback_store.record_last_played("u1", {"id": "t1"})
+    await playback_store.flush_playback_writes()
+    assert playback_store.record_last_played("u1", {"id": "t1"})
\ No newline at end of file
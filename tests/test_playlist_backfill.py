@@ -0,0 +1,55 @@
+# tests/test_playlist_backfill.py
+import asyncio
+from db.jobs import ensure_job_indexes
+from services import playlist_backfill
+
+
+async def test_users_spanning_pages_are_counted_once(monkeypatch):
+    # u1's playlists straddle the first page boundary, u3's the second
+    stored = [("u1", "p1"), ("u1", "p2"), ("u1", "p3"), ("u2", "p1"), ("u3", "p1"), ("u3", "p2")]
+    progress = {}
+
+    async def find_job(job_id):
+        return {"_id": job_id, "status": "running", "checkpoint": None}
+
+    async def hold_lease(job_id):
+        return True
+
+    async def list_after(after, limit):
+        rows = [r for r in stored if after is None or r > tuple(after)][:limit]
+        return [{"user_id": u, "playlist_id": p} for u, p in rows]
+
+    async def backfill_user(user_id, playlist_ids, *_):
+        return {"updates": [(user_id, pid, {"tracks": 1}) for pid in playlist_ids], "failed": 0}
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def checkpoint(job_id, checkpoint, increments):
+        for key, value in increments.items():
+            progress[key] = progress.get(key, 0) + value
+
+    monkeypatch.setattr(playlist_backfill, "BACKFILL_BATCH_SIZE", 2)
+    monkeypatch.setattr(playlist_backfill, "find_job", find_job)
+    monkeypatch.setattr(playlist_backfill, "_hold_lease", hold_lease)
+    monkeypatch.setattr(playlist_backfill, "list_profile_playlists_after", list_after)
+    monkeypatch.setattr(playlist_backfill, "_backfill_user", backfill_user)
+    monkeypatch.setattr(playlist_backfill, "bulk_update_profile_playlists", noop)
+    monkeypatch.setattr(playlist_backfill, "checkpoint_job", checkpoint)
+    monkeypatch.setattr(playlist_backfill, "finish_job", noop)
+
+    await playlist_backfill.run_playlist_backfill("job")
+
+    assert progress == {"users_processed": 3, "playlists_updated": 6, "playlists_failed": 0}
+
+
+async def test_concurrent_starts_share_one_job(mongo_db, monkeypatch):
+    db, _ = mongo_db
+    await ensure_job_indexes()
+    spawned = []
+    monkeypatch.setattr(playlist_backfill, "_spawn", spawned.append)
+
+    job_ids = await asyncio.gather(*(playlist_backfill.start_playlist_backfill() for _ in range(20)))
+
+    assert len(set(job_ids)) == 1
+    assert await db.jobs.count_documents({"kind": playlist_backfill.JOB_KIND, "status": "running"}) == 1
\ No newline at end of file
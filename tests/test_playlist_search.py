@@ -0,0 +1,93 @@
+# tests/test_playlist_search.py
+"""/user-playlists/search against the full /user-playlists array for a 5k-playlist user.
+
+Needs TEST_MONGODB_URI; skipped otherwise.
+"""
+import random
+import time
+import httpx
+from fastapi import FastAPI
+from api import playlists as playlist_routes
+from db.playlists import apply_synced_playlist_changes, ensure_playlist_indexes
+
+PLAYLISTS = 5000
+PREFIXES = ["Chill", "chill out", "Road Trip", "Workout", "Focus", "Mix"]
+
+
+async def _seed(user_id: str) -> list:
+    rng = random.Random(0)
+    entries = [
+        {
+            "id": f"p{i:05}",
+            "name": f"{rng.choice(PREFIXES)} {i}",
+            "tracks": rng.randint(0, 500),
+            "owner_id": user_id,
+            "image": f"https://i.scdn.co/image/{i:040}",
+            "external_url": f"https://open.spotify.com/playlist/p{i:05}",
+            "snapshot_id": f"s{i:031}",
+        }
+        for i in range(PLAYLISTS)
+    ]
+    await apply_synced_playlist_changes(user_id, entries, [], [])
+    return entries
+
+
+async def _walk(client: httpx.AsyncClient, params: dict) -> tuple:
+    """Every page of a search; returns (playlists, first page, bytes of the first page)."""
+    playlists, cursor, first = [], None, None
+    while True:
+        response = await client.get(
+            "/user-playlists/search", params={**params, **({"cursor": cursor} if cursor else {})}
+        )
+        assert response.status_code == 200
+        page = response.json()
+        if first is None:
+            first = (page, len(response.content))
+        playlists += page["playlists"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return playlists, first
+
+
+async def test_search_pages_match_the_full_array(mongo_db):
+    user_id = "u-many"
+    await ensure_playlist_indexes()
+    entries = await _seed(user_id)
+
+    app = FastAPI()
+    app.include_router(playlist_routes.router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        started = time.perf_counter()
+        full = await client.get("/user-playlists", params={"user_id": user_id})
+        full_ms = (time.perf_counter() - started) * 1000
+        assert full.status_code == 200
+        assert len(full.json()["playlists"]) == PLAYLISTS
+
+        started = time.perf_counter()
+        page = await client.get(
+            "/user-playlists/search", params={"user_id": user_id, "q": "chill", "limit": 50}
+        )
+        page_ms = (time.perf_counter() - started) * 1000
+
+        by_tracks, (first, first_bytes) = await _walk(client, {"user_id": user_id, "q": "chill", "limit": 100})
+        by_name, _ = await _walk(client, {"user_id": user_id, "q": "Road", "sort": "name", "limit": 100})
+
+    print(
+        f"\n{PLAYLISTS} playlists: full array {len(full.content) / 1024:.0f}KiB in {full_ms:.0f}ms, "
+        f"first search page {len(page.content) / 1024:.1f}KiB in {page_ms:.0f}ms"
+    )
+
+    chill = [e for e in entries if e["name"].lower().startswith("chill")]
+    assert first["total"] == len(chill)
+    assert [p["id"] for p in by_tracks] == [
+        e["id"] for e in sorted(chill, key=lambda e: (-e["tracks"], e["id"]))
+    ]
+    road = [e for e in entries if e["name"].lower().startswith("road")]
+    assert [p["id"] for p in by_name] == [
+        e["id"] for e in sorted(road, key=lambda e: (e["name"].lower(), e["id"]))
+    ]
+    assert by_tracks[0].keys() == full.json()["playlists"][0].keys() - {"updated_at"}
+
+    assert len(page.json()["playlists"]) == 50
+    assert len(page.content) * 10 < len(full.content)
+    assert first_bytes < len(full.content)
\ No newline at end of file
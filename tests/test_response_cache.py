@@ -0,0 +1,112 @@
+# tests/test_response_cache.py
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from api import public
+from db.users import _notify_write
+from services import response_cache
+from services.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """A fresh in-process public cache, as a single worker without Redis runs it."""
+    fresh = ResponseCache("test_cache")
+    monkeypatch.setattr(response_cache, "get_redis", lambda: None)
+    monkeypatch.setattr(response_cache, "WEB_CONCURRENCY", 1)
+    monkeypatch.setattr(response_cache, "public_cache", fresh)
+    monkeypatch.setattr(public, "public_cache", fresh)
+    return fresh
+
+
+async def test_viral_profile_load(cache, monkeypatch):
+    """Thousands of viewers of one profile while its owner keeps writing."""
+    state = {"version": 0, "reads": 0}
+
+    async def find_public_profile(user_id):
+        state["reads"] += 1
+        # Slow enough that concurrent misses overlap the build
+        await asyncio.sleep(0.01)
+        return {
+            "user_id": user_id,
+            "display_name": f"Viral v{state['version']}",
+            "all": [],
+            "featured": [],
+            "total": 0,
+            "next_cursor": None,
+        }
+
+    monkeypatch.setattr(public, "find_public_profile", find_public_profile)
+    app = FastAPI()
+    app.include_router(public.router)
+
+    writes, viewers_per_write = 5, 400
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        for _ in range(writes):
+            state["version"] += 1
+            await _notify_write(["viral"])
+            responses = await asyncio.gather(
+                *(client.get("/public-profile/viral") for _ in range(viewers_per_write))
+            )
+            assert {r.status_code for r in responses} == {200}
+            # Nobody sees the profile from before the write
+            assert {r.json()["display_name"] for r in responses} == {f"Viral v{state['version']}"}
+
+    # One Mongo read per write, however many viewers arrived at once
+    assert state["reads"] == writes
+    stats = cache.stats()
+    print(f"\n{writes * viewers_per_write} views, {state['reads']} builds, hit rate {stats['hit_rate']}")
+    assert stats["hit_rate"] >= 0.99
+
+
+async def test_etag_revalidation(cache, monkeypatch):
+    async def find_public_profile(user_id):
+        return {"user_id": user_id, "all": [], "featured": [], "total": 0, "next_cursor": None}
+
+    monkeypatch.setattr(public, "find_public_profile", find_public_profile)
+    app = FastAPI()
+    app.include_router(public.router)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/public-profile/u1")
+        again = await client.get("/public-profile/u1", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert cache.stats()["hits"] == 1
+
+
+async def test_generations_are_capped_without_serving_stale_entries(cache):
+    cache.max_generations = 10
+    builds = []
+
+    async def build(user_id, version):
+        builds.append((user_id, version))
+        return {"user_id": user_id, "version": version}
+
+    for version in range(3):
+        for i in range(50):
+            user_id = f"u{i}"
+            await cache.invalidate([user_id])
+            await cache.get_or_build("profile", user_id, lambda: build(user_id, version))
+
+    assert len(cache._generations) == 10
+    # u0 fell out long ago: it is rebuilt, never answered from an older generation
+    cached = await cache.get_or_build("profile", "u0", lambda: build("u0", "rebuilt"))
+    assert b'"version":"rebuilt"' in cached.body
+    # A user still tracked keeps hitting its entry
+    cached = await cache.get_or_build("profile", "u49", lambda: build("u49", "rebuilt"))
+    assert b'"version":2' in cached.body
+
+
+async def test_disabled_across_workers_without_redis(cache, monkeypatch):
+    monkeypatch.setattr(response_cache, "WEB_CONCURRENCY", 4)
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return {"ok": True}
+
+    for _ in range(3):
+        await cache.get_or_build("profile", "u1", build)
+    assert len(calls) == 3
+    assert cache.stats()["enabled"] is False
\ No newline at end of file
@@ -0,0 +1,102 @@
+# tests/test_responses.py
+import json
+import random
+import string
+import time
+from datetime import datetime, timezone
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from core.responses import FastJSONResponse, dumps
+
+
+def _text(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(string.ascii_letters + " éü✨") for _ in range(n))
+
+
+def _playlist(rng: random.Random) -> dict:
+    return {
+        "id": _text(rng, 22),
+        "name": _text(rng, 30),
+        "image": "https://i.scdn.co/image/" + _text(rng, 40),
+        "tracks": rng.randint(1, 900),
+        "external_url": "https://open.spotify.com/playlist/" + _text(rng, 22),
+        "snapshot_id": _text(rng, 32),
+    }
+
+
+def dashboard_payload(playlists: int, seed: int = 0) -> dict:
+    """Shaped like a /dashboard response, datetimes included."""
+    rng = random.Random(seed)
+    return {
+        "playlists": {
+            "all": [_playlist(rng) for _ in range(playlists)],
+            "featured": [_playlist(rng) for _ in range(6)],
+            "total": playlists,
+            "next_cursor": None,
+        },
+        "genres": {
+            "highest": [
+                {
+                    "genre": _text(rng, 10),
+                    "count": rng.randint(1, 50),
+                    "percentage": rng.random() * 100,
+                    "gradient": ["#123456", "#abcdef"],
+                }
+                for _ in range(10)
+            ],
+            "sub_genres": {_text(rng, 8): [_text(rng, 12) for _ in range(8)] for _ in range(10)},
+            "last_updated": datetime(2025, 3, 4, 5, 6, 7, 891000, tzinfo=timezone.utc),
+        },
+        "last_played": {
+            "track": {
+                "id": _text(rng, 22),
+                "name": _text(rng, 20),
+                "played_at": datetime(2025, 1, 2, 3, 4, 5, 123000),
+            }
+        },
+    }
+
+
+def test_output_matches_stdlib_json_response():
+    for playlists in (0, 50, 1000):
+        payload = dashboard_payload(playlists, seed=playlists)
+        assert FastJSONResponse(payload).body == JSONResponse(jsonable_encoder(payload)).body
+
+
+def test_object_ids_render_as_strings():
+    oid = ObjectId()
+    assert json.loads(dumps({"_id": oid})) == {"_id": str(oid)}
+
+
+def test_plain_return_values_with_object_ids():
+    app = FastAPI(default_response_class=FastJSONResponse)
+    oid = ObjectId()
+
+    @app.get("/doc")
+    async def doc():
+        return {"_id": oid, "at": datetime(2025, 1, 1, tzinfo=timezone.utc)}
+
+    response = TestClient(app).get("/doc")
+    assert response.status_code == 200
+    assert response.json() == {"_id": str(oid), "at": "2025-01-01T00:00:00+00:00"}
+
+
+def _best_of(fn, runs: int = 5) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def test_serialization_benchmark():
+    """Rendering a 5k-playlist dashboard with orjson against the stdlib path."""
+    payload = dashboard_payload(5000)
+    stdlib = _best_of(lambda: JSONResponse(jsonable_encoder(payload)).body)
+    fast = _best_of(lambda: FastJSONResponse(payload).body)
+    print(f"\n5000 playlists: stdlib {stdlib * 1000:.1f}ms, orjson {fast * 1000:.1f}ms")
+    assert fast < stdlib
\ No newline at end of file
@@ -0,0 +1,45 @@
+# tests/test_spotify_api.py
+import httpx
+from services.spotify_api import SPOTIFY_API_URL, SpotifyAPI
+
+
+def listing(total: int, short_offsets: dict) -> httpx.MockTransport:
+    """An offset-paged listing whose pages at ``short_offsets`` lose that many items."""
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        offset, limit = int(request.url.params["offset"]), int(request.url.params["limit"])
+        requested.append(offset)
+        ids = range(offset, min(offset + limit, total))
+        items = [{"id": i} for i in ids][short_offsets.get(offset, 0) :]
+        return httpx.Response(200, json={"items": items, "total": total})
+
+    transport = httpx.MockTransport(handler)
+    transport.requested = requested
+    return transport
+
+
+async def _collect(transport: httpx.MockTransport, **kwargs) -> list:
+    api = SpotifyAPI()
+    api._client = httpx.AsyncClient(base_url=SPOTIFY_API_URL, transport=transport)
+    try:
+        return [item["id"] async for item in api.paginate("/me/playlists", "token", **kwargs)]
+    finally:
+        await api.aclose()
+
+
+async def test_short_pages_do_not_end_the_listing():
+    # Unavailable items leave the first and a middle page short
+    transport = listing(230, {0: 1, 100: 3})
+    ids = await _collect(transport)
+
+    assert sorted(transport.requested) == [0, 50, 100, 150, 200]
+    assert ids == [i for i in range(230) if i != 0 and i not in (100, 101, 102)]
+
+
+async def test_max_items_bounds_the_pages():
+    transport = listing(500, {})
+    ids = await _collect(transport, max_items=120)
+
+    assert sorted(transport.requested) == [0, 50, 100]
+    assert ids == list(range(120))
\ No newline at end of file
@@ -0,0 +1,38 @@
+# tests/test_spotify_me.py
+import httpx
+import pytest
+from fastapi import FastAPI
+from api import spotify as spotify_routes
+from core.errors import add_exception_handlers
+from services.spotify_api import SPOTIFY_API_URL, SpotifyAPI
+
+
+@pytest.mark.parametrize(
+    "spotify_status, expected",
+    [(401, 401), (403, 401), (429, 503), (500, 502), (503, 502)],
+)
+async def test_spotify_errors_keep_their_meaning(monkeypatch, spotify_status, expected):
+    def handler(request: httpx.Request) -> httpx.Response:
+        # Retry-After 0 so the governor's cooldown does not hold up other tests
+        return httpx.Response(
+            spotify_status, json={"error": {"message": "nope"}}, headers={"Retry-After": "0"}
+        )
+
+    async def get_token_by_user_id(user_id):
+        return "token"
+
+    api = SpotifyAPI()
+    api._client = httpx.AsyncClient(base_url=SPOTIFY_API_URL, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(spotify_routes, "spotify_api", api)
+    monkeypatch.setattr(spotify_routes, "get_token_by_user_id", get_token_by_user_id)
+
+    app = FastAPI()
+    add_exception_handlers(app)
+    app.include_router(spotify_routes.router)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/spotify-me", params={"user_id": "u1"})
+    finally:
+        await api.aclose()
+
+    assert response.status_code == expected
\ No newline at end of file
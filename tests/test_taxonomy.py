@@ -0,0 +1,105 @@
+# tests/test_taxonomy.py
+import json
+import random
+import time
+from services.music.taxonomy import GENRE_MAP_PATH, GenreTaxonomy, TAXONOMY, normalize
+
+
+class LinearScanResolver:
+    """Reference resolver: every fallback scans the whole genre map."""
+
+    def __init__(self, parents: dict):
+        self.parents = parents
+        self.entries = [(tuple(genre.split()), parent) for genre, parent in parents.items()]
+
+    def resolve(self, genre: str):
+        genre_lc = normalize(genre)
+        if genre_lc in self.parents:
+            return self.parents[genre_lc]
+        tokens = tuple(genre_lc.split())
+
+        # Longest mapped suffix
+        best, best_size = None, 0
+        for words, parent in self.entries:
+            if best_size < len(words) <= len(tokens) and tokens[-len(words) :] == words:
+                best, best_size = parent, len(words)
+        if best is not None:
+            return best
+
+        # Longest mapped run of words, earliest first
+        best, best_key = None, None
+        for words, parent in self.entries:
+            size = len(words)
+            if size >= len(tokens):
+                continue
+            for start in range(len(tokens) - size + 1):
+                if tokens[start : start + size] == words:
+                    key = (-size, start)
+                    if best_key is None or key < best_key:
+                        best, best_key = parent, key
+                    break
+        return best
+
+
+def known_genres(count: int, seed: int = 0) -> list:
+    """Mapped genres as Spotify spells them, plus prefixed, suffixed and unmapped variants."""
+    rng = random.Random(seed)
+    mapped = sorted(TAXONOMY.parents)
+    genres = []
+    for _ in range(count):
+        genre = rng.choice(mapped)
+        variant = rng.randrange(5)
+        if variant == 1:
+            genre = f"{rng.choice(['tokyo', 'west coast', 'swedish', 'dark'])} {genre}"
+        elif variant == 2:
+            genre = f"{genre} {rng.choice(['francais', 'revival', 'argentino'])}"
+        elif variant == 3:
+            genre = f" {genre.upper()} "
+        elif variant == 4:
+            genre = f"zz{rng.randrange(10**6)} unheard of"
+        genres.append(genre)
+    return genres
+
+
+def test_resolver_matches_linear_scan():
+    reference = LinearScanResolver(TAXONOMY.parents)
+    for genre in known_genres(2000) + ["west coast hip hop", "swedish indie pop", "hip hop francais"]:
+        assert TAXONOMY.resolve(genre) == reference.resolve(genre), genre
+
+
+def _per_second(resolve, genres) -> float:
+    started = time.perf_counter()
+    for genre in genres:
+        resolve(genre)
+    return len(genres) / (time.perf_counter() - started)
+
+
+def test_lookup_and_cold_load_benchmark(tmp_path):
+    genres = known_genres(500, seed=1)
+    linear = _per_second(LinearScanResolver(TAXONOMY.parents).resolve, genres)
+
+    taxonomy = GenreTaxonomy(TAXONOMY.parents, TAXONOMY.gradients, TAXONOMY.meta_genres)
+    cold = _per_second(taxonomy.resolve, genres)
+    warm = _per_second(taxonomy.resolve, genres)
+
+    started = time.perf_counter()
+    with open(GENRE_MAP_PATH) as f:
+        json.load(f)
+    json_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    GenreTaxonomy.from_sources()
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    artifact = str(tmp_path / "taxonomy.pickle")
+    TAXONOMY.dump(artifact)
+    started = time.perf_counter()
+    loaded = GenreTaxonomy.load(artifact)
+    artifact_ms = (time.perf_counter() - started) * 1000
+
+    print(
+        f"\nlookups/s: linear scan {linear:,.0f}, trie {cold:,.0f}, memoized {warm:,.0f}"
+        f"\ncold load: genre-map.json parse {json_ms:.1f}ms, compile {compile_ms:.1f}ms, artifact {artifact_ms:.1f}ms"
+    )
+    assert loaded is not None and loaded.parents == TAXONOMY.parents
+    assert linear < cold < warm
\ No newline at end of file
@@ -0,0 +1,34 @@
+# tests/test_token.py
+import asyncio
+import time
+import pytest
+from services import token
+
+
+@pytest.fixture
+def touched(monkeypatch):
+    """Fresh token state; returns the users whose activity was written."""
+    users = []
+
+    async def touch(user_id):
+        users.append(user_id)
+
+    monkeypatch.setattr(token, "touch_user_activity", touch)
+    monkeypatch.setattr(token, "_token_cache", {})
+    monkeypatch.setattr(token, "_last_activity", {})
+    return users
+
+
+async def test_cache_hits_record_activity_throttled(touched, monkeypatch):
+    token.cache_token("u1", "a1", int(time.time()) + 3600)
+
+    for _ in range(3):
+        assert await token.get_token_by_user_id("u1") == "a1"
+        await asyncio.gather(*token._activity_writes)
+    assert touched == ["u1"]
+
+    # Once the interval has passed the next hit records it again
+    monkeypatch.setattr(token, "TOKEN_ACTIVITY_INTERVAL", 0)
+    await token.get_token_by_user_id("u1")
+    await asyncio.gather(*token._activity_writes)
+    assert touched == ["u1", "u1"]
\ No newline at end of file
@@ -0,0 +1,65 @@
+# tests/test_token_refresher.py
+import json
+import httpx
+from services import spotify_auth, token_refresher
+from services.spotify_api import SpotifyAPI
+
+
+def token_endpoint(requests: list) -> httpx.MockTransport:
+    """A stub of Spotify's token endpoint keyed on the refresh token sent."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        form = dict(httpx.QueryParams(request.content.decode()))
+        assert form["grant_type"] == "refresh_token"
+        if form["refresh_token"] == "r-revoked":
+            return httpx.Response(
+                400, json={"error": "invalid_grant", "error_description": "Refresh token revoked"}
+            )
+        if form["refresh_token"] == "r-flaky":
+            return httpx.Response(503, text="Service unavailable")
+        # No refresh_token in the answer: Spotify did not rotate it
+        return httpx.Response(200, json={"access_token": "a-new", "token_type": "Bearer", "expires_in": 3600})
+
+    return httpx.MockTransport(handler)
+
+
+async def test_failed_refreshes_are_recorded(monkeypatch):
+    users = [
+        {"user_id": "ok", "refresh_token": "r-ok", "expires_at": 0},
+        {"user_id": "revoked", "refresh_token": "r-revoked", "expires_at": 0},
+        {"user_id": "flaky", "refresh_token": "r-flaky", "expires_at": 0},
+    ]
+    written, cached, requests = {}, {}, []
+
+    async def find_users(**_):
+        return users
+
+    async def bulk_update(refreshed):
+        written["refreshed"] = {user_id: token_info for user_id, _, token_info in refreshed}
+
+    async def mark_failures(failures):
+        written["failures"] = sorted(failures)
+
+    api = SpotifyAPI()
+    api._client = httpx.AsyncClient(transport=token_endpoint(requests))
+    monkeypatch.setattr(spotify_auth, "spotify_api", api)
+    monkeypatch.setattr(token_refresher, "find_users_with_expiring_tokens", find_users)
+    monkeypatch.setattr(token_refresher, "bulk_update_tokens", bulk_update)
+    monkeypatch.setattr(token_refresher, "mark_token_refresh_failures", mark_failures)
+    monkeypatch.setattr(
+        token_refresher, "cache_token", lambda user_id, *args: cached.setdefault(user_id, args)
+    )
+
+    try:
+        result = await token_refresher.refresh_expiring_tokens()
+    finally:
+        await api.aclose()
+
+    assert result == {"candidates": 3, "refreshed": 1, "failed": 2}
+    assert {str(r.url) for r in requests} == {spotify_auth.SPOTIFY_TOKEN_URL}
+    assert list(written["refreshed"]) == ["ok"]
+    assert written["refreshed"]["ok"]["access_token"] == "a-new"
+    assert written["refreshed"]["ok"]["refresh_token"] == "r-ok"
+    assert written["failures"] == [("flaky", False), ("revoked", True)]
+    assert list(cached) == ["ok"]
\ No newline at end of file
@@ -0,0 +1,59 @@
+# tests/test_top_tracks.py
+import httpx
+from api import spotify as spotify_routes
+from services import artists
+from services.spotify_api import SPOTIFY_API_URL, SpotifyAPI
+
+ARTIST_COUNT = 50
+
+
+def _track(i: int) -> dict:
+    # Each track features the next track's primary artist, so IDs repeat across tracks
+    artist_ids = [f"artist{i}", f"artist{(i + 1) % ARTIST_COUNT}"]
+    return {
+        "id": f"track{i}",
+        "name": f"Track {i}",
+        "artists": [{"id": a, "name": a.title()} for a in artist_ids],
+        "album": {"name": f"Album {i}"},
+        "external_urls": {"spotify": f"https://open.spotify.com/track/track{i}"},
+        "external_ids": {"isrc": f"ISRC{i}"},
+    }
+
+
+async def test_fifty_top_tracks_take_at_most_two_calls(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/me/top/tracks"):
+            limit = int(request.url.params["limit"])
+            return httpx.Response(200, json={"items": [_track(i) for i in range(limit)]})
+        if request.url.path.endswith("/artists"):
+            ids = request.url.params["ids"].split(",")
+            return httpx.Response(200, json={"artists": [{"id": a, "genres": [f"{a}-pop"]} for a in ids]})
+        return httpx.Response(404, json={"error": {"message": "unexpected"}})
+
+    api = SpotifyAPI()
+    api._client = httpx.AsyncClient(base_url=SPOTIFY_API_URL, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(spotify_routes, "spotify_api", api)
+    monkeypatch.setattr(artists, "spotify_api", api)
+
+    # An empty cache with no Mongo behind it, so every artist is a miss
+    async def find_artist_genres(artist_ids):
+        return {}
+
+    async def save_artist_genres(genre_map):
+        return None
+
+    monkeypatch.setattr(artists, "find_artist_genres", find_artist_genres)
+    monkeypatch.setattr(artists, "save_artist_genres", save_artist_genres)
+    monkeypatch.setattr(artists, "artist_genre_cache", artists.ArtistGenreCache())
+
+    try:
+        result = await spotify_routes.get_top_tracks(access_token="token", limit=50)
+    finally:
+        await api.aclose()
+
+    assert len(requests) <= 2
+    assert len(result["top_tracks"]) == 50
+    assert result["top_tracks"][0]["genres"] == ["artist0-pop", "artist1-pop"]
\ No newline at end of file
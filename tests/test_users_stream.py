@@ -0,0 +1,96 @@
+# tests/test_users_stream.py
+import json
+import tracemalloc
+from api import user as user_api
+from db import users
+
+SMALL, LARGE = 5_000, 50_000
+
+
+async def _peak_stream_memory(ndjson: bool, limit=None):
+    """(bytes streamed, peak traced memory) for one /users stream."""
+    tracemalloc.start()
+    size = 0
+    try:
+        async for chunk in user_api._stream_users(None, ndjson=ndjson, limit=limit):
+            size += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size, peak
+
+
+class _FakeCursor:
+    """Generates user documents lazily, like a server-side cursor."""
+
+    def __init__(self, count: int):
+        self.count = count
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, limit: int):
+        self.count = min(self.count, limit)
+        return self
+
+    def batch_size(self, size: int):
+        return self
+
+    async def __aiter__(self):
+        for i in range(self.count):
+            yield {"user_id": f"u{i:08}", "display_name": f"User {i}", "email": f"u{i}@example.com"}
+
+
+def _fake_users(monkeypatch, count: int):
+    class Collection:
+        def find(self, query, projection):
+            return _FakeCursor(count)
+
+    monkeypatch.setattr(users, "_users", lambda: Collection())
+
+
+async def _collect(ndjson: bool, limit=None) -> bytes:
+    return b"".join([c async for c in user_api._stream_users(None, ndjson=ndjson, limit=limit)])
+
+
+async def test_stream_output(monkeypatch):
+    _fake_users(monkeypatch, 1234)
+    assert len(json.loads(await _collect(ndjson=False))) == 1234
+    lines = (await _collect(ndjson=True)).splitlines()
+    assert len(lines) == 1234 and json.loads(lines[-1])["user_id"] == "u00001233"
+    assert len((await _collect(ndjson=True, limit=10)).splitlines()) == 10
+
+    _fake_users(monkeypatch, 0)
+    assert json.loads(await _collect(ndjson=False)) == []
+
+
+async def test_stream_memory_is_flat(monkeypatch):
+    for ndjson in (False, True):
+        _fake_users(monkeypatch, SMALL)
+        small_size, small_peak = await _peak_stream_memory(ndjson)
+        _fake_users(monkeypatch, LARGE)
+        large_size, large_peak = await _peak_stream_memory(ndjson)
+        assert large_size > 9 * small_size
+        assert large_peak < 1.5 * small_peak, (small_peak, large_peak)
+
+
+async def test_stream_memory_is_flat_against_mongo(mongo_db):
+    db, _ = mongo_db
+    await users.ensure_user_indexes()
+
+    async def seed(start: int, stop: int):
+        for offset in range(start, stop, 5_000):
+            await db.users.insert_many(
+                [
+                    {"user_id": f"u{i:08}", "display_name": f"User {i}", "email": f"u{i}@example.com"}
+                    for i in range(offset, min(offset + 5_000, stop))
+                ]
+            )
+
+    await seed(0, SMALL)
+    small_size, small_peak = await _peak_stream_memory(ndjson=True)
+    await seed(SMALL, LARGE)
+    large_size, large_peak = await _peak_stream_memory(ndjson=True)
+
+    assert large_size > 9 * small_size
+    assert large_peak < 1.5 * small_peak, (small_peak, large_peak)
\ No newline at end of file